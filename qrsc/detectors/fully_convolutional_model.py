@@ -0,0 +1,203 @@
+from functools import reduce
+
+from keras import backend as K
+from keras.layers import (
+    Concatenate, Conv1D, Dense, Dropout, Flatten, Input, InputLayer, Lambda,
+    MaxPooling1D)
+from keras.models import Model
+
+import numpy as np
+
+from ..utils.indexutils import rescale_indexes
+from ..utils.nnutils import (
+    ACTIVATIONS, activation_name, dense_stack, dense_weights)
+
+# number of trigger signal samples computed per forward pass
+DEFAULT_BLOCK_SIZE = 2**14
+
+
+def _layer_of(tensor):
+    return tensor._keras_history[0]
+
+
+def _dilated_max_pooling(pool_size, dilation):
+    """Max pooling with stride 1 over every dilation-th sample."""
+    if dilation == 1:
+        return MaxPooling1D(pool_size=pool_size, strides=1)
+
+    span = (pool_size - 1) * dilation
+
+    def pool(x):
+        length = K.shape(x)[1] - span
+        return reduce(K.maximum, [
+            x[:, offset:offset + length]
+            for offset in range(0, span + 1, dilation)])
+
+    return Lambda(pool)
+
+
+class Branch:
+    """Path from a model input through convolutional layers to a Flatten
+    layer.
+    """
+
+    def __init__(self, model, flatten):
+        self.flatten = flatten
+        self.layers = []
+        layer = _layer_of(flatten.input)
+        while not isinstance(layer, InputLayer):
+            self.layers.insert(0, layer)
+            layer = _layer_of(layer.input)
+        self.input_index = [
+            _layer_of(tensor) for tensor in model.inputs].index(layer)
+
+    def fully_convolutional(self, visible, kernel):
+        """Apply the branch to a whole signal. Pooling strides are replaced by
+        dilation of the following layers and the part of the first Dense layer
+        belonging to this branch (kernel) becomes a convolution spanning all
+        flattened positions.
+        """
+        prev = visible
+        dilation = 1
+        layers_and_weights = []
+        for layer in self.layers:
+            if isinstance(layer, Conv1D):
+                if layer.strides != (1,) or layer.padding != 'valid':
+                    raise ValueError("Unsupported convolution in {}.".format(
+                        layer.name))
+                conv = Conv1D(
+                    layer.filters, layer.kernel_size,
+                    dilation_rate=dilation * layer.dilation_rate[0],
+                    activation=layer.activation)
+                prev = conv(prev)
+                layers_and_weights.append((conv, layer.get_weights()))
+            elif isinstance(layer, MaxPooling1D):
+                if layer.padding != 'valid':
+                    raise ValueError("Unsupported pooling in {}.".format(
+                        layer.name))
+                prev = _dilated_max_pooling(layer.pool_size[0], dilation)(prev)
+                dilation *= layer.strides[0]
+            elif not isinstance(layer, Dropout):
+                raise ValueError("Unsupported layer {}.".format(layer.name))
+
+        positions, channels = self.flatten.input_shape[1:]
+        head = Conv1D(
+            kernel.shape[1], positions, dilation_rate=dilation, use_bias=False)
+        prev = head(prev)
+        layers_and_weights.append(
+            (head, [kernel.reshape(positions, channels, kernel.shape[1])]))
+        return prev, layers_and_weights
+
+
+class FullyConvolutionalModel:
+    """Fully convolutional equivalent of a trained windowed CNN.
+
+    The windowed model predicts one trigger signal sample per window. This
+    model computes the same samples for all windows of a whole signal without
+    recomputing the convolutions of overlapping windows. Convolutional
+    branches run in Keras, the Dense layers after the first one run in NumPy.
+    """
+
+    def __init__(self, model, window_sizes):
+        self.window_sizes = window_sizes
+
+        # Dense layers between Flatten/Concatenate and output
+        head = []
+        layer = _layer_of(model.outputs[0])
+        while not isinstance(layer, (Flatten, Concatenate)):
+            if not isinstance(layer, (Dense, Dropout)):
+                raise ValueError("Unsupported layer {}.".format(layer.name))
+            head.insert(0, layer)
+            layer = _layer_of(layer.input)
+        head = [layer for layer in head if isinstance(layer, Dense)]
+
+        flattens = (
+            [_layer_of(tensor) for tensor in layer.input]
+            if isinstance(layer, Concatenate) else [layer])
+        self.branches = [Branch(model, flatten) for flatten in flattens]
+        self.input_indexes = sorted(set(
+            branch.input_index for branch in self.branches))
+
+        first_kernel, self.first_bias = head[0].get_weights()
+        self.first_activation = activation_name(head[0])
+        self.head_weights = dense_weights(head[1:])
+
+        visibles = {
+            input_index: Input(shape=(None, 1))
+            for input_index in self.input_indexes}
+        outputs = []
+        layers_and_weights = []
+        row = 0
+        for branch in self.branches:
+            rows = int(np.prod(branch.flatten.input_shape[1:]))
+            output, weights = branch.fully_convolutional(
+                visibles[branch.input_index], first_kernel[row:row + rows])
+            outputs.append(output)
+            layers_and_weights.extend(weights)
+            row += rows
+
+        self.model = Model(
+            inputs=[visibles[idx] for idx in self.input_indexes],
+            outputs=outputs)
+        for layer, weights in layers_and_weights:
+            layer.set_weights(weights)
+
+    def __positions(self, input_signals, num_windows):
+        """Window positions in every input used for the windows of the first
+        input, adjusted like WindowGenerator adjusts rescaled indexes.
+        """
+        window_indexes = np.arange(num_windows)
+        positions = {}
+        for input_index in self.input_indexes:
+            window_size = self.window_sizes[input_index]
+            usable_length = len(input_signals[input_index]) - window_size + 1
+            input_positions = rescale_indexes(
+                window_indexes, self.window_sizes[0], window_size)
+            positions[input_index] = np.where(
+                input_positions == usable_length,
+                input_positions - 1, input_positions)
+        return positions
+
+    def predict(self, input_signals, batch_size=None, block_size=None):
+        """Trigger signal samples for all windows of the input signals.
+
+        Args:
+            input_signals: One signal per model input.
+            batch_size: If given, samples of the last incomplete batch are
+                dropped, just like windowed prediction with a generator does.
+            block_size: Number of samples computed per forward pass. Limits
+                memory consumption.
+        Returns:
+            One prediction per window of the first input signal.
+        """
+        block_size = DEFAULT_BLOCK_SIZE if block_size is None else block_size
+        num_windows = len(input_signals[0]) - self.window_sizes[0] + 1
+        if batch_size is not None:
+            num_windows = (num_windows // batch_size) * batch_size
+        positions = self.__positions(input_signals, num_windows)
+
+        predictions = []
+        for start in range(0, num_windows, block_size):
+            end = min(start + block_size, num_windows)
+            segments = []
+            for input_index in self.input_indexes:
+                first = positions[input_index][start]
+                last = positions[input_index][end - 1]
+                segment = input_signals[input_index][
+                    first:last + self.window_sizes[input_index]]
+                segments.append(np.asarray(
+                    segment, dtype=np.float32)[np.newaxis, :, np.newaxis])
+
+            outputs = self.model.predict(segments)
+            if len(self.branches) == 1:
+                outputs = [outputs]
+
+            hidden = self.first_bias
+            for branch, output in zip(self.branches, outputs):
+                branch_positions = positions[branch.input_index][start:end]
+                hidden = hidden + output[0][
+                    branch_positions - branch_positions[0]]
+            hidden = ACTIVATIONS[self.first_activation](hidden)
+            predictions.append(dense_stack(hidden, self.head_weights).flatten())
+
+        return np.concatenate([np.zeros(0)] + predictions)
@@ -1,5 +1,7 @@
 from . import NNDetector
 from ..generators import SingleSignalWindowGenerator, WindowGenerator
+from ..utils.nnutils import dense_stack_blocked, dense_weights
+from ..utils.signalutils import sliding_windows
 
 from keras.layers import Dense
 from keras.models import Sequential
@@ -7,20 +9,31 @@ from keras.utils import multi_gpu_model
 
 import numpy as np
 
+# number of windows evaluated per matrix multiplication in NumPy inference
+NUMPY_BLOCK_SIZE = 2**14
+
 class GarciaBerdonesDetector(NNDetector):
 
+    wrap_samples = False
+
     # Initialization
 
     def __init__(
             self, name, batch_size, window_size,
-            threshold=None, tolerance=None, epochs=1, gpus=0
+            threshold=None, tolerance=None, epochs=1, gpus=0,
+            numpy_inference=False,
+            workers=16, max_queue_size=16, use_multiprocessing=True
     ):
-        super().__init__(threshold=threshold, tolerance=tolerance)
+        super().__init__(
+            threshold=threshold, tolerance=tolerance, workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
         self.name = name
         self.batch_size = batch_size
         self.window_size = window_size
         self.epochs = epochs
         self.gpus = gpus
+        self.numpy_inference = numpy_inference
         self.model = self._build_model()
 
     def __str__(self):
@@ -31,7 +44,9 @@ class GarciaBerdonesDetector(NNDetector):
             "\tThreshold: {}".format(self.threshold),
             "\tTolerance: {}".format(self.tolerance),
             "\tTraining Epochs: {}".format(self.epochs),
-            "\tNumber of GPUs used: {}".format(self.gpus)])
+            "\tNumber of GPUs used: {}".format(self.gpus),
+            "\tNumPy Inference: {}".format(self.numpy_inference),
+            self._data_loading()])
 
     def _build_model(self):
         model = Sequential()
@@ -45,22 +60,41 @@ class GarciaBerdonesDetector(NNDetector):
         model.compile(optimizer='rmsprop', loss='binary_crossentropy')
         return model
 
+    def _feature_chains(self):
+        return [()]
+
+    def _window_sizes(self):
+        return [self.window_size]
+
     # QRSDetector interface
 
     def train(self, records, triggers):
         ecg_signals = [record.p_signal.T[0] for record in records]
-        self.history = self.model.fit_generator(
-            generator = SingleSignalWindowGenerator(
-                ecg_signals, self.batch_size, self.window_size, triggers),
-            shuffle=True, epochs=self.epochs,
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        self._fit(SingleSignalWindowGenerator(
+            ecg_signals, self.batch_size, self.window_size, triggers))
+
+    def _numpy_trigger_signal(self, record):
+        """Generate trigger signal without TensorFlow by evaluating the
+        trained weights on a strided window view of the record.
+        """
+        windows = sliding_windows(record.p_signal.T[0], self.window_size)
+        # the window generator drops the last incomplete batch
+        num_windows = (len(windows) // self.batch_size) * self.batch_size
+        weights = dense_weights([
+            layer for layer in self.model.layers if isinstance(layer, Dense)])
+        predictions = dense_stack_blocked(
+            windows[:num_windows], weights, NUMPY_BLOCK_SIZE)
+        return np.append(
+            # zero-padding with half window size due to offset
+            np.zeros(self.window_size // 2),
+            predictions.flatten())
 
     def trigger_signal(self, record):
+        if self.numpy_inference:
+            return self._numpy_trigger_signal(record)
         ecg_signal = record.p_signal.T[0]
-        predictions = self.model.predict_generator(
-            generator = WindowGenerator(
-                [ecg_signal], self.batch_size, self.window_size),
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        predictions = self._predict(WindowGenerator(
+            [ecg_signal], self.batch_size, self.window_size))
         return np.append(
             # zero-padding with half window size due to offset
             np.zeros(self.window_size // 2),
@@ -1,37 +1,213 @@
 from abc import abstractmethod
+from collections import OrderedDict
+from inspect import signature
 from os.path import dirname
 from os import makedirs
 
+import numpy as np
+
 from . import QRSDetector
+from .fully_convolutional_model import FullyConvolutionalModel
+from ..generators import (
+    BatchFeeder, MultiSignalWindowGenerator, WindowGenerator)
+from ..utils.featureutils import FEATURE_VERSION, features
 from ..utils.triggerutils import signal_to_points
 
 DEFAULT_THRESHOLD = .8
 DEFAULT_TOLERANCE = 10
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_QUEUE_SIZE = 16
+# trigger_and_signal, which evaluations use, keeps the signal_to_points
+# defaults, so that reported metrics stay comparable
+EVALUATION_THRESHOLD = .5
+EVALUATION_TOLERANCE = 3
 
 class NNDetector(QRSDetector):
 
-    def __init__(self, threshold=None, tolerance=None):
+    # whether windows are shaped (window_size, 1) instead of (window_size,)
+    wrap_samples = True
+
+    # alternative inference modes not using a window generator
+    fully_convolutional = False
+    numpy_inference = False
+
+    # trained models can be cached with save_model and load_model
+    model_cacheable = True
+
+    # constructor parameters without influence on the trained model
+    inference_params = (
+        'name', 'threshold', 'tolerance', 'fully_convolutional',
+        'numpy_inference', 'workers', 'max_queue_size', 'use_multiprocessing')
+
+    def __init__(
+            self, threshold=None, tolerance=None,
+            workers=DEFAULT_WORKERS, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+            use_multiprocessing=True
+    ):
         self.threshold = DEFAULT_THRESHOLD if threshold is None else threshold
         self.tolerance = DEFAULT_TOLERANCE if tolerance is None else tolerance
+        # loads batches for training and prediction, pool is kept until closed
+        self.feeder = BatchFeeder(
+            workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
+        # fully convolutional equivalent of the trained model, built on demand
+        self._convolutional_model = None
+
+    def __getstate__(self):
+        """Detectors are pickled without their model, e.g. for evaluation in
+        worker processes. Unpickled detectors have an untrained model.
+        """
+        state = self.__dict__.copy()
+        state.pop('model', None)
+        state.pop('history', None)
+        state['_convolutional_model'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.model = self._build_model()
 
-    # Additional abstract method
+    # Additional abstract methods
 
     @abstractmethod
     def _build_model(self):
         """Build the detector-specific neural network (model)."""
         pass
 
+    @abstractmethod
+    def _feature_chains(self):
+        """Transform chains computing the signals of the model inputs from
+        the first channel, see qrsc.utils.featureutils. The empty chain ()
+        is the raw signal.
+        """
+        pass
+
+    @abstractmethod
+    def _window_sizes(self):
+        """Window sizes of the model inputs."""
+        pass
+
+    # Model inputs
+
+    def _input_signals(self, record):
+        """Signals the model inputs are windows of, one per model input.
+        They are shared with other detectors via the feature store.
+        """
+        return features(record, self._feature_chains())
+
+    def _training_signals(self, records):
+        """Input signals of records as one list of signal chunks per model
+        input.
+        """
+        record_inputs = [self._input_signals(record) for record in records]
+        return [list(chunks) for chunks in zip(*record_inputs)]
+
+    def _predicts_with_generator(self):
+        """Whether trigger signals are predicted from a window generator
+        over _input_signals, so that several records can share one generator.
+        """
+        return not (self.fully_convolutional or self.numpy_inference)
+
     # Common implementations
 
+    def _data_loading(self):
+        """Line describing the batch feeder for __str__."""
+        return "\tData Loading: {} {}, queue size {}".format(
+            self.feeder.workers,
+            "processes" if self.feeder.use_multiprocessing else "threads",
+            self.feeder.max_queue_size)
+
+    def _fit(self, generator):
+        """Train the model on all batches of generator for self.epochs
+        shuffled epochs.
+        """
+        self._convolutional_model = None
+        self.history = self.model.fit_generator(
+            generator=self.feeder.epochs(generator, self.epochs, shuffle=True),
+            steps_per_epoch=len(generator), epochs=self.epochs, workers=0)
+
+    def _predict(self, generator):
+        """Predict all batches of generator."""
+        return self.model.predict_generator(
+            generator=self.feeder.batches(generator),
+            steps=len(generator), workers=0)
+
+    def _prediction_generator(self, signals):
+        """Window generator for prediction. Signals contains one list of
+        signal chunks per model input. The last batch may be incomplete, so
+        that all windows are predicted.
+        """
+        if len(signals) == 1:
+            return WindowGenerator(
+                signals[0], self.batch_size, self._window_sizes()[0],
+                wrap_samples=self.wrap_samples, partial_batch=True)
+        return MultiSignalWindowGenerator(
+            signals=signals,
+            batch_size=self.batch_size,
+            window_sizes=self._window_sizes(),
+            wrap_samples=self.wrap_samples,
+            partial_batch=True)
+
+    def _fully_convolutional_trigger_signal(self, record):
+        """Generate trigger signal with the fully convolutional equivalent
+        of the trained model in one pass over the record.
+        """
+        if self._convolutional_model is None:
+            # built once per trained model, every build adds layers to the graph
+            self._convolutional_model = FullyConvolutionalModel(
+                self.model, self._window_sizes())
+        predictions = self._convolutional_model.predict(
+            self._input_signals(record), batch_size=self.batch_size)
+        return np.append(
+            # zero-padding with half window size due to offset
+            np.zeros(self.window_size // 2),
+            predictions)
+
+    def close(self):
+        """Shut down the data loading workers. They are started again when
+        needed, so the detector stays usable.
+        """
+        self.feeder.close()
+
     def reset(self):
         """Rebuild model from scratch throwing away all weights."""
         self.model = self._build_model()
+        self._convolutional_model = None
+
+    def model_params(self):
+        """Constructor parameters the trained model depends on and the
+        version of the features it is trained on, e.g. for identifying cached
+        models.
+        """
+        params = OrderedDict(
+            (name, getattr(self, name))
+            for name in signature(type(self)).parameters
+            if name not in self.inference_params and hasattr(self, name))
+        params['feature_version'] = FEATURE_VERSION
+        return params
 
     def save_model(self, path):
         """Save trained model with weights to file."""
         makedirs(dirname(path), exist_ok=True)
         self.model.save(path)
 
+    def load_model(self, path):
+        """Load the weights of a model saved with save_model into the model
+        of this detector.
+        """
+        self.model.load_weights(path)
+        self._convolutional_model = None
+
+    def trigger_params(self):
+        """Threshold and tolerance trigger_and_signal derives trigger points
+        with. They differ from self.threshold and self.tolerance used by
+        trigger and detect.
+        """
+        return OrderedDict([
+            ('threshold', EVALUATION_THRESHOLD),
+            ('tolerance', EVALUATION_TOLERANCE)])
+
     def trigger(self, record):
         """Find trigger points in single ECG recording."""
         return signal_to_points(
@@ -39,10 +215,55 @@ class NNDetector(QRSDetector):
             tolerance=self.tolerance,
             threshold=self.threshold)
 
+    def trigger_signals(self, records):
+        """Generate trigger signals for multiple ECG recordings with one
+        prediction pass over all records. Every trigger signal equals the one
+        trigger_signal returns for the record.
+        """
+        if not records or not self._predicts_with_generator():
+            return super().trigger_signals(records)
+
+        record_inputs = [self._input_signals(record) for record in records]
+        predictions = self._predict(self._prediction_generator(
+            [list(chunks) for chunks in zip(*record_inputs)])).flatten()
+
+        trigger_signals = []
+        offset = 0
+        for inputs in record_inputs:
+            num_windows = max(len(inputs[0]) - self._window_sizes()[0] + 1, 0)
+            # single record prediction drops the last incomplete batch
+            num_predictions = (num_windows // self.batch_size) * self.batch_size
+            trigger_signals.append(np.append(
+                # zero-padding with half window size due to offset
+                np.zeros(self.window_size // 2),
+                predictions[offset:offset + num_predictions]))
+            offset += num_windows
+        return trigger_signals
+
+    def detect(self, records):
+        """Find trigger points in multiple ECG recordings."""
+        return [
+            signal_to_points(
+                signal=trigger_signal,
+                tolerance=self.tolerance,
+                threshold=self.threshold)
+            for trigger_signal in self.trigger_signals(records)]
+
+    def triggers_and_signals(self, records):
+        """Return trigger signals and trigger points of multiple ECG
+        recordings generated with one prediction pass.
+        """
+        trigger_signals = self.trigger_signals(records)
+        triggers = [
+            signal_to_points(signal=trigger_signal, **self.trigger_params())
+            for trigger_signal in trigger_signals]
+        return triggers, trigger_signals
+
     def trigger_and_signal(self, record):
         """Return trigger signal and trigger points to avoid generating trigger
         signal twice.
         """
         trigger_signal = self.trigger_signal(record)
-        trigger = signal_to_points(trigger_signal)
+        trigger = signal_to_points(
+            signal=trigger_signal, **self.trigger_params())
         return trigger, trigger_signal
\ No newline at end of file
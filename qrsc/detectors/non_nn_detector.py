@@ -1,7 +1,33 @@
+from collections import OrderedDict
+from inspect import signature
+
 from . import QRSDetector
 
 class NonNNDetector(QRSDetector):
 
+    # detections only depend on the parameters and the record
+    detection_cacheable = True
+
+    def detection_params(self):
+        """Constructor parameters the detections depend on, e.g. for
+        identifying cached detections. Every parameter must be stored as an
+        attribute of the same name, otherwise subclasses have to override
+        this method.
+
+        Raises:
+            AttributeError: If a constructor parameter is not stored.
+        """
+        params = OrderedDict()
+        for name in signature(type(self)).parameters:
+            if name == 'name':
+                continue
+            if not hasattr(self, name):
+                raise AttributeError(
+                    "Parameter {} of {} is not stored as attribute, override "
+                    "detection_params.".format(name, type(self).__name__))
+            params[name] = getattr(self, name)
+        return params
+
     def train(self, records, triggers):
         """Do nothing since this is not machine learning."""
         pass
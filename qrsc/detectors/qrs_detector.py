@@ -2,9 +2,32 @@ from abc import ABC, abstractmethod
 
 class QRSDetector(ABC):
 
+    # trained models can be cached with save_model and load_model
+    model_cacheable = False
+
+    # detections only depend on the parameters and the record
+    detection_cacheable = False
+
     def __repr__(self):
         return "{} ({})".format(self.name, self.__class__.__name__)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release resources held between calls, e.g. worker pools."""
+        pass
+
+    def trigger_params(self):
+        """Threshold and tolerance trigger_and_signal derives trigger points
+        from trigger signals with by signal_to_points. Empty if trigger points
+        are derived otherwise.
+        """
+        return {}
+
     def trigger_signals(self, records):
         """Generate (multiple) trigger signals for multiple ECG recordings."""
         return [self.trigger_signal(record) for record in records]
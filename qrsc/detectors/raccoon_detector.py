@@ -7,7 +7,6 @@ import numpy as np
 
 from . import NNDetector
 from ..generators import MultiSignalWindowGenerator
-from ..utils.signalutils import window_average
 
 
 class RaccoonDetector(NNDetector):
@@ -16,9 +15,14 @@ class RaccoonDetector(NNDetector):
 
     def __init__(
         self, name, batch_size, window_size, detection_size, winavg_sizes,
-        threshold=None, tolerance=None, epochs=1, gpus=0
+        threshold=None, tolerance=None, epochs=1, gpus=0,
+        fully_convolutional=False,
+        workers=16, max_queue_size=16, use_multiprocessing=True
     ):
-        super().__init__(threshold=threshold, tolerance=tolerance)
+        super().__init__(
+            threshold=threshold, tolerance=tolerance, workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
         self.name = name
         self.batch_size = batch_size
         self.window_size = window_size
@@ -26,6 +30,7 @@ class RaccoonDetector(NNDetector):
         self.winavg_sizes = winavg_sizes
         self.epochs = epochs
         self.gpus = gpus
+        self.fully_convolutional = fully_convolutional
         self.model = self._build_model()
 
     def __str__(self):
@@ -38,7 +43,10 @@ class RaccoonDetector(NNDetector):
             "\tThreshold: {}".format(self.threshold),
             "\tTolerance: {}".format(self.tolerance),
             "\tTraining Epochs: {}".format(self.epochs),
-            "\tNumber of GPUs used: {}".format(self.gpus)])
+            "\tNumber of GPUs used: {}".format(self.gpus),
+            "\tFully Convolutional Inference: {}".format(
+                self.fully_convolutional),
+            self._data_loading()])
 
     def _build_model(self):
         visibles = [
@@ -61,16 +69,21 @@ class RaccoonDetector(NNDetector):
         model.compile(optimizer='rmsprop', loss='binary_crossentropy')
         return model
 
+    def _feature_chains(self):
+        return [
+            (('window_average', winavg_size), ('ediff1d',))
+            for winavg_size in self.winavg_sizes]
+
+    def _window_sizes(self):
+        return [
+            self.window_size // winavg_size
+            for winavg_size in self.winavg_sizes]
+
     # QRSDetector interface
 
     def train(self, records, triggers):
-        ecg_signals = [record.p_signal.T[0] for record in records]
-        signals = [[
-                np.ediff1d(window_average(ecg_signal, winavg_size))
-                for ecg_signal in ecg_signals]
-            for winavg_size in self.winavg_sizes]
         gen = MultiSignalWindowGenerator(
-            signals=signals,
+            signals=self._training_signals(records),
             batch_size=self.batch_size,
             window_sizes=[
                 self.window_size // winavg_size
@@ -79,24 +92,16 @@ class RaccoonDetector(NNDetector):
             detection_size=self.detection_size,
             wrap_samples=True
         )
-        self.history = self.model.fit_generator(
-            generator=gen, shuffle=True, epochs=self.epochs,
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        self._fit(gen)
 
     def trigger_signal(self, record):
-        ecg_signal = record.p_signal.T[0]
-        signals = [
-            [np.ediff1d(window_average(ecg_signal, winavg_size))]
-            for winavg_size in self.winavg_sizes]
-        predictions = self.model.predict_generator(
-            generator = MultiSignalWindowGenerator(
-                signals=signals,
-                batch_size=self.batch_size,
-                window_sizes=[
-                    self.window_size // winavg_size
-                    for winavg_size in self.winavg_sizes],
-                wrap_samples = True),
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        if self.fully_convolutional:
+            return self._fully_convolutional_trigger_signal(record)
+        predictions = self._predict(MultiSignalWindowGenerator(
+            signals=[[signal] for signal in self._input_signals(record)],
+            batch_size=self.batch_size,
+            window_sizes=self._window_sizes(),
+            wrap_samples = True))
         return np.append(
             # zero-padding with half window size due to offset
             np.zeros(self.window_size // 2),
@@ -1,6 +1,5 @@
 from . import NNDetector
 from ..generators import MultiSignalWindowGenerator
-from ..utils.signalutils import window_average
 
 from keras.layers import Conv1D, Dense, Dropout, Flatten, Input, MaxPooling1D
 from keras.layers.merge import concatenate
@@ -17,9 +16,13 @@ class RXDetector(NNDetector):
             self, name, batch_size, window_size, detection_size, aux_ratio,
             threshold=None, tolerance=None,
             depth=1, width=32, input_dropout=0.0, conv_dropout=0.0,
-            epochs=1, gpus=0
+            epochs=1, gpus=0, fully_convolutional=False,
+            workers=16, max_queue_size=16, use_multiprocessing=True
     ):
-        super().__init__(threshold=threshold, tolerance=tolerance)
+        super().__init__(
+            threshold=threshold, tolerance=tolerance, workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
         self.name = name
         self.batch_size = batch_size
         self.window_size = window_size
@@ -31,6 +34,7 @@ class RXDetector(NNDetector):
         self.conv_dropout = conv_dropout
         self.epochs = epochs
         self.gpus = gpus
+        self.fully_convolutional = fully_convolutional
         self.model = self._build_model()
 
     def __str__(self):
@@ -45,7 +49,10 @@ class RXDetector(NNDetector):
             "\tThreshold: {}".format(self.threshold),
             "\tTolerance: {}".format(self.tolerance),
             "\tTraining Epochs: {}".format(self.epochs),
-            "\tNumber of GPUs used: {}".format(self.gpus)])
+            "\tNumber of GPUs used: {}".format(self.gpus),
+            "\tFully Convolutional Inference: {}".format(
+                self.fully_convolutional),
+            self._data_loading()])
 
     def _build_model(self):
         visible1 = Input(shape=(self.window_size, 1))
@@ -74,16 +81,19 @@ class RXDetector(NNDetector):
         model.compile(optimizer='rmsprop', loss='binary_crossentropy')
         return model
 
+    def _feature_chains(self):
+        return [
+            (('ediff1d',),),
+            (('window_average', self.aux_ratio), ('ediff1d',))]
+
+    def _window_sizes(self):
+        return [self.window_size, self.window_size // self.aux_ratio]
+
     # QRSDetector interface
 
     def train(self, records, triggers):
-        ecg_signals = [record.p_signal.T[0] for record in records]
-        diff_signals = [np.ediff1d(signal) for signal in ecg_signals]
-        aux_signals = [
-            np.ediff1d(window_average(signal, self.aux_ratio))
-            for signal in ecg_signals]
         gen = MultiSignalWindowGenerator(
-            signals=[diff_signals, aux_signals],
+            signals=self._training_signals(records),
             batch_size=self.batch_size,
             window_sizes=[
                 self.window_size,
@@ -92,23 +102,16 @@ class RXDetector(NNDetector):
             detection_size = self.detection_size,
             wrap_samples = True
         )
-        self.history = self.model.fit_generator(
-            generator = gen, shuffle=True, epochs=self.epochs,
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        self._fit(gen)
 
     def trigger_signal(self, record):
-        ecg_signal = record.p_signal.T[0]
-        predictions = self.model.predict_generator(
-            generator = MultiSignalWindowGenerator(
-                signals=[
-                    [np.ediff1d(ecg_signal)],
-                    [np.ediff1d(window_average(ecg_signal, self.aux_ratio))]],
-                batch_size=self.batch_size,
-                window_sizes=[
-                    self.window_size,
-                    self.window_size // self.aux_ratio],
-                wrap_samples = True),
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        if self.fully_convolutional:
+            return self._fully_convolutional_trigger_signal(record)
+        predictions = self._predict(MultiSignalWindowGenerator(
+            signals=[[signal] for signal in self._input_signals(record)],
+            batch_size=self.batch_size,
+            window_sizes=self._window_sizes(),
+            wrap_samples = True))
         return np.append(
             # zero-padding with half window size due to offset
             np.zeros(self.window_size // 2),
@@ -13,15 +13,21 @@ class SarlijaDetector(NNDetector):
 
     def __init__(
             self, name, batch_size, window_size, detection_size,
-            threshold=None, tolerance=None, epochs=1, gpus=0
+            threshold=None, tolerance=None, epochs=1, gpus=0,
+            fully_convolutional=False,
+            workers=16, max_queue_size=16, use_multiprocessing=True
     ):
-        super().__init__(threshold=threshold, tolerance=tolerance)
+        super().__init__(
+            threshold=threshold, tolerance=tolerance, workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
         self.name = name
         self.batch_size = batch_size
         self.window_size = window_size
         self.detection_size = detection_size
         self.epochs = epochs
         self.gpus = gpus
+        self.fully_convolutional = fully_convolutional
         self.model = self._build_model()
 
     def __str__(self):
@@ -33,7 +39,10 @@ class SarlijaDetector(NNDetector):
             "\tThreshold: {}".format(self.threshold),
             "\tTolerance: {}".format(self.tolerance),
             "\tTraining Epochs: {}".format(self.epochs),
-            "\tNumber of GPUs used: {}".format(self.gpus)])
+            "\tNumber of GPUs used: {}".format(self.gpus),
+            "\tFully Convolutional Inference: {}".format(
+                self.fully_convolutional),
+            self._data_loading()])
 
     def _build_model(self):
         model = Sequential()
@@ -53,24 +62,27 @@ class SarlijaDetector(NNDetector):
         model.compile(optimizer='rmsprop', loss='binary_crossentropy')
         return model
 
+    def _feature_chains(self):
+        return [()]
+
+    def _window_sizes(self):
+        return [self.window_size]
+
     # QRSDetector interface
 
     def train(self, records, triggers):
         ecg_signals = [record.p_signal.T[0] for record in records]
-        self.history = self.model.fit_generator(
-            generator = SingleSignalWindowGenerator(
-                ecg_signals, self.batch_size, self.window_size, triggers,
-                self.detection_size, True),
-            shuffle=True, epochs=self.epochs,
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        self._fit(SingleSignalWindowGenerator(
+            ecg_signals, self.batch_size, self.window_size, triggers,
+            self.detection_size, True))
 
     def trigger_signal(self, record):
+        if self.fully_convolutional:
+            return self._fully_convolutional_trigger_signal(record)
         ecg_signal = record.p_signal.T[0]
-        predictions = self.model.predict_generator(
-            generator = WindowGenerator(
-                [ecg_signal], self.batch_size, self.window_size,
-                wrap_samples=True),
-            use_multiprocessing=True, workers=16, max_queue_size=16)
+        predictions = self._predict(WindowGenerator(
+            [ecg_signal], self.batch_size, self.window_size,
+            wrap_samples=True))
         return np.append(
             # zero-padding with half window size due to offset
             np.zeros(self.window_size // 2),
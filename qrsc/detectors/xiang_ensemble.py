@@ -1,16 +1,44 @@
-from copy import copy
+from multiprocessing import cpu_count, get_context
+
+from keras.layers import Average, Input
+from keras.models import Model
 
 import numpy as np
 
 from .nn_detector import NNDetector
 from .xiang_detector import XiangDetector
+from ..generators import MultiSignalWindowGenerator
+from ..utils.tfutils import limit_threads
+
+
+def _train_member(member_params, record, trigger, num_threads):
+    """Train an ensemble member in a pool process and return its weights."""
+    limit_threads(num_threads)
+    # pool processes are daemonic and cannot start data loading workers
+    detector = XiangDetector(
+        name=record.record_name, workers=0, **member_params)
+    detector.train([record], [trigger])
+    return detector.model.get_weights()
 
 
 class MultiDetectorModel:
 
-    def __init__(self, prototype):
-        self.prototype = prototype
+    def __init__(self, member_params, feeder, processes=1):
+        """One XiangDetector per training record.
+
+        Args:
+            member_params (dict): XiangDetector constructor arguments except
+                name, used for every member.
+            feeder (BatchFeeder): Data loading feeder shared by all members.
+            processes (int, optional): Number of members trained concurrently
+                in spawned processes. Members are trained one after another in
+                this process if 1.
+        """
+        self.member_params = member_params
+        self.feeder = feeder
+        self.processes = processes
         self.detectors = []
+        self.fused = None
 
     def num_detectors(self):
         return len(self.detectors)
@@ -19,10 +47,33 @@ class MultiDetectorModel:
         for detector in self.detectors:
             detector.save_model(path)
 
+    def _member(self, name):
+        """Build a member with a fresh, untrained model."""
+        detector = XiangDetector(name=name, **self.member_params)
+        detector.feeder = self.feeder
+        return detector
+
+    def _train_parallel(self, records, triggers):
+        processes = min(self.processes, len(records))
+        # share the cores among the processes instead of oversubscribing them
+        num_threads = max(cpu_count() // processes, 1)
+        # spawned processes do not inherit the TensorFlow state of this one
+        with get_context('spawn').Pool(processes) as pool:
+            weights = pool.starmap(_train_member, [
+                (self.member_params, record, trigger, num_threads)
+                for record, trigger in zip(records, triggers)])
+        for record, member_weights in zip(records, weights):
+            detector = self._member(record.record_name)
+            detector.model.set_weights(member_weights)
+            self.detectors.append(detector)
+
     def train(self, records, triggers):
+        self.fused = None
+        if self.processes > 1 and len(records) > 1:
+            self._train_parallel(records, triggers)
+            return
         for record, trigger in zip(records, triggers):
-            detector = copy(self.prototype)
-            detector.name = record.record_name
+            detector = self._member(record.record_name)
             detector.train([record], [trigger])
             self.detectors.append(detector)
 
@@ -31,26 +82,66 @@ class MultiDetectorModel:
             detector.trigger_signal(record)
             for detector in self.detectors]
 
+    def mean_trigger_signal(self, record):
+        """Mean of the members' trigger signals, accumulated one member at a
+        time.
+        """
+        total = None
+        for detector in self.detectors:
+            trigger_signal = detector.trigger_signal(record)
+            if total is None:
+                total = np.array(trigger_signal, dtype=np.float64)
+            else:
+                total += trigger_signal
+        return total / self.num_detectors()
+
+    def fused_model(self):
+        """Keras model averaging the outputs of all members for the same
+        inputs. Built once per training.
+        """
+        if self.fused is None:
+            window_size = self.member_params['window_size']
+            inputs = [
+                Input(shape=(window_size, 1)),
+                Input(shape=(
+                    window_size // self.member_params['aux_ratio'], 1))]
+            outputs = [
+                detector.model(inputs) for detector in self.detectors]
+            self.fused = Model(
+                inputs=inputs,
+                outputs=Average()(outputs) if len(outputs) > 1 else outputs[0])
+        return self.fused
+
 
 class XiangEnsemble(NNDetector):
 
+    # members are trained and saved per training record
+    model_cacheable = False
+
     def __init__(
             self, name, batch_size, window_size, detection_size, aux_ratio,
             threshold=None, tolerance=None,
             depth=1, width=32,
-            epochs=1, gpus=0
+            epochs=1, gpus=0, fully_convolutional=False,
+            workers=16, max_queue_size=16, use_multiprocessing=True,
+            train_processes=1, fused_inference=False
     ):
+        super().__init__(
+            threshold=threshold, tolerance=tolerance, workers=workers,
+            max_queue_size=max_queue_size,
+            use_multiprocessing=use_multiprocessing)
         self.name = name
         self.batch_size = batch_size
         self.window_size = window_size
         self.detection_size = detection_size
         self.aux_ratio = aux_ratio
-        self.threshold = threshold
-        self.tolerance = tolerance
         self.depth = depth
         self.width = width
         self.epochs = epochs
         self.gpus = gpus
+        self.fully_convolutional = fully_convolutional
+        self.train_processes = train_processes
+        self.fused_inference = fused_inference
         self.model = self._build_model()
 
     def __str__(self):
@@ -63,25 +154,56 @@ class XiangEnsemble(NNDetector):
             "\tThreshold: {}".format(self.threshold),
             "\tTolerance: {}".format(self.tolerance),
             "\tTraining Epochs: {}".format(self.epochs),
-            "\tNumber of GPUs used: {}".format(self.gpus)])
+            "\tNumber of GPUs used: {}".format(self.gpus),
+            "\tTraining Processes: {}".format(self.train_processes),
+            "\tFully Convolutional Inference: {}".format(
+                self.fully_convolutional),
+            "\tFused Inference: {}".format(self.fused_inference),
+            self._data_loading()])
 
     def _build_model(self):
-        model = MultiDetectorModel(
-            XiangDetector(
-                name="",  # name set later on
-                batch_size=self.batch_size,
-                window_size=self.window_size,
-                detection_size=self.detection_size,
-                aux_ratio=self.aux_ratio,
-                depth=self.depth,
-                width=self.width,
-                epochs=self.epochs,
-                gpus=self.gpus))
-        return model
+        member_params = dict(
+            batch_size=self.batch_size,
+            window_size=self.window_size,
+            detection_size=self.detection_size,
+            aux_ratio=self.aux_ratio,
+            depth=self.depth,
+            width=self.width,
+            epochs=self.epochs,
+            gpus=self.gpus,
+            fully_convolutional=self.fully_convolutional)
+        return MultiDetectorModel(
+            member_params, self.feeder, self.train_processes)
+
+    def _feature_chains(self):
+        return [
+            (('ediff1d',),),
+            (('window_average', self.aux_ratio), ('ediff1d',))]
+
+    def _window_sizes(self):
+        return [self.window_size, self.window_size // self.aux_ratio]
+
+    def _predicts_with_generator(self):
+        # fully convolutional members predict one after another
+        return self.fused_inference and not self.fully_convolutional
+
+    def _predict(self, generator):
+        return self.model.fused_model().predict_generator(
+            generator=self.feeder.batches(generator),
+            steps=len(generator), workers=0)
 
     def train(self, records, triggers):
         self.model.train(records, triggers)
 
     def trigger_signal(self, record):
-        trigger_signals = np.array(self.model.trigger_signals(record))
-        return trigger_signals.sum(axis=0) / self.model.num_detectors()
+        if not self._predicts_with_generator():
+            return self.model.mean_trigger_signal(record)
+        predictions = self._predict(MultiSignalWindowGenerator(
+            signals=[[signal] for signal in self._input_signals(record)],
+            batch_size=self.batch_size,
+            window_sizes=self._window_sizes(),
+            wrap_samples=True))
+        return np.append(
+            # zero-padding with half window size due to offset
+            np.zeros(self.window_size // 2),
+            predictions.flatten())
@@ -1,7 +1,9 @@
 from collections import OrderedDict
 from time import time
 
-from .utils.evaluationutils import trigger_metrics, sensitivity, ppv, f1
+from .utils.evaluationutils import (
+    beat_type_counts, trigger_metrics, metrics_table, sensitivity, ppv, f1)
+from .utils.storeutils import save_trigger_signals
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -14,7 +16,9 @@ class Evaluation():
         self, output_dir, evaluation_id, detector,
         train_records, train_triggers,
         test_records, test_triggers,
-        trigger_distance
+        trigger_distance, report_distances=None,
+        test_labels=None, beat_classes=None, model_cache=None,
+        detection_cache=None
     ):
         self.output_dir = output_dir
         self.id = evaluation_id
@@ -31,24 +35,86 @@ class Evaluation():
         self.test_triggers = test_triggers
 
         self.trigger_distance = trigger_distance
+        # additional trigger distances reported for the same detections
+        self.report_distances = (
+            [] if report_distances is None else list(report_distances))
+
+        # beat class labels of test triggers for per-class sensitivity
+        if test_labels is None:
+            test_labels = [[] for _ in test_triggers]
+            beat_classes = []
+        if not len(test_labels) == len(test_triggers):
+            raise ValueError('Test labels have different length.')
+        self.test_labels = test_labels
+        self.beat_classes = (
+            sorted(set().union(*test_labels)) if beat_classes is None
+            else list(beat_classes))
+
+        # trained models are loaded from the cache instead of training again
+        self.model_cache = model_cache
+        self.model_loaded = False
+        # detections of deterministic detectors are loaded from the cache
+        self.detection_cache = detection_cache
 
     def run(self):
         self.detector.reset()
-        self.detector.train(self.train_records, self.train_triggers)
+        self._train()
         self._timed_detection()
         self.metrics = [
             trigger_metrics(true, detected, self.trigger_distance)
             for true, detected
             in zip(self.test_triggers, self.detected_triggers)]
+        self.distance_metrics = metrics_table(
+            self.test_triggers, self.detected_triggers, self.report_distances)
+        # beats and detected beats per record and beat class
+        counts = [
+            beat_type_counts(
+                true, labels, detected, self.trigger_distance,
+                self.beat_classes)
+            for true, labels, detected in zip(
+                self.test_triggers, self.test_labels, self.detected_triggers)]
+        shape = (len(counts), len(self.beat_classes))
+        self.beats = np.array(
+            [beats for beats, _ in counts], dtype=int).reshape(shape)
+        self.detected_beats = np.array(
+            [tp for _, tp in counts], dtype=int).reshape(shape)
+
+    def _train(self):
+        if self.model_cache is None or not self.model_cache.supports(
+                self.detector):
+            self.detector.train(self.train_records, self.train_triggers)
+            return
+        key = self.model_cache.key(
+            self.detector, self.train_records, self.train_triggers)
+        self.model_loaded = self.model_cache.load(self.detector, key)
+        if not self.model_loaded:
+            self.detector.train(self.train_records, self.train_triggers)
+            self.model_cache.save(self.detector, key)
 
     def _timed_detection(self):
         self.trigger_signals = []
         self.detected_triggers = []
         self.runtimes = []
+        self.cache_hits = []
         for record in self.test_records:
             self._timed_detection_for(record)
 
     def _timed_detection_for(self, record):
+        cached = (
+            self.detection_cache is not None
+            and self.detection_cache.supports(self.detector))
+        if cached:
+            key = self.detection_cache.key(self.detector, record)
+            detection = self.detection_cache.load(key)
+            if detection is not None:
+                trigger, signal, runtime = detection
+                self.trigger_signals.append(signal)
+                self.detected_triggers.append(trigger)
+                # runtime measured when the detection was cached
+                self.runtimes.append(runtime)
+                self.cache_hits.append(True)
+                return
+
         start_time = time()
         trigger, signal = self.detector.trigger_and_signal(record)
         end_time = time()
@@ -56,6 +122,38 @@ class Evaluation():
         self.trigger_signals.append(signal)
         self.detected_triggers.append(trigger)
         self.runtimes.append(runtime)
+        self.cache_hits.append(False)
+        if cached:
+            self.detection_cache.save(key, trigger, signal, runtime)
+
+    def _distance_entries(self, distance_metrics):
+        """Report entries for the additional trigger distances given the
+        metrics for each of them.
+        """
+        entries = []
+        for distance, metric in zip(self.report_distances, distance_metrics):
+            tp, tn, fp, fn = map(int, metric)
+            entries.extend([
+                ('TP@{}'.format(distance), tp),
+                ('FP@{}'.format(distance), fp),
+                ('FN@{}'.format(distance), fn),
+                ('Sensitivity@{}'.format(distance), sensitivity(tp, fn)),
+                ('PPV@{}'.format(distance), ppv(tp, fp)),
+                ('F1@{}'.format(distance), f1(tp, fp, fn))])
+        return entries
+
+    def _beat_type_entries(self, beats, detected_beats):
+        """Report entries with the number of beats and the sensitivity per
+        beat class.
+        """
+        entries = []
+        for beat_class, class_beats, tp in zip(
+                self.beat_classes, beats.tolist(), detected_beats.tolist()):
+            entries.extend([
+                ('Beats {}'.format(beat_class), class_beats),
+                ('Sensitivity {}'.format(beat_class),
+                 sensitivity(tp, class_beats - tp))])
+        return entries
 
     def _aggregated_record(self):
         tp, tn, fp, fn = tuple(map(sum, zip(*self.metrics))) # aggregated metrics
@@ -68,13 +166,20 @@ class Evaluation():
             ('TP', tp), ('TN', tn), ('FP', fp), ('FN', fn),
             ('Sensitivity', sensitivity(tp, fn)),
             ('PPV', ppv(tp, fp)),
-            ('F1', f1(tp, fp, fn)),
-            ('Detection Runtime', runtime)])
+            ('F1', f1(tp, fp, fn))]
+            + self._distance_entries(self.distance_metrics.sum(axis=0))
+            + self._beat_type_entries(
+                self.beats.sum(axis=0), self.detected_beats.sum(axis=0))
+            + [('Detection Runtime', runtime),
+               ('Cached Detection', all(self.cache_hits))])
 
     def report(self):
         report = []
-        report_data = zip(self.test_records, self.metrics, self.runtimes)
-        for test_record, metric, runtime in report_data:
+        report_data = zip(
+            self.test_records, self.metrics, self.distance_metrics,
+            self.beats, self.detected_beats, self.runtimes, self.cache_hits)
+        for test_record, metric, distance_metrics, beats, detected_beats, \
+                runtime, cache_hit in report_data:
             tp, tn, fp, fn = metric
             report.append(OrderedDict([
                 ('ID', self.id),
@@ -84,8 +189,11 @@ class Evaluation():
                 ('TP', tp), ('TN', tn), ('FP', fp), ('FN', fn),
                 ('Sensitivity', sensitivity(tp, fn)),
                 ('PPV', ppv(tp, fp)),
-                ('F1', f1(tp, fp, fn)),
-                ('Detection Runtime', runtime)]))
+                ('F1', f1(tp, fp, fn))]
+                + self._distance_entries(distance_metrics)
+                + self._beat_type_entries(beats, detected_beats)
+                + [('Detection Runtime', runtime),
+                   ('Cached Detection', cache_hit)]))
         report.append(self._aggregated_record())
         return report
 
@@ -98,6 +206,21 @@ class Evaluation():
                 self._file_name_for(test_record), "atr", np.array(trigger),
                 ['N']*len(trigger), write_dir=self.output_dir)
 
+    def save_trigger_signals(self):
+        """Store the trigger signals of the test records in half precision
+        for re-thresholding them with qrsc.utils.storeutils.rethreshold.
+        Detectors generating no trigger signals store nothing.
+
+        Returns:
+            Number of stored trigger signals.
+        """
+        return save_trigger_signals(
+            "{}/trigger_signals".format(self.output_dir), self._file_name(),
+            self.id, self.detector,
+            [record.record_name for record in self.test_records],
+            self.test_triggers, self.trigger_signals, self.trigger_distance,
+            **self.detector.trigger_params())
+
     def save_model(self):
         self.detector.save_model("{}/{}.h5".format(
             self.output_dir, self._file_name()))
@@ -1,20 +1,43 @@
-from .utils.annotationutils import trigger_points
+from .utils.annotationutils import BEAT_CLASSIFIERS
+from .utils.cacheutils import DetectionCache, ModelCache
+from .utils.recordutils import LazyRecord, read_record, read_trigger
+from .utils.tfutils import limit_threads
 from .evaluation import Evaluation
+from .generators import ArrayStore
 
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
 from itertools import product
+from multiprocessing import cpu_count, get_context
 from sklearn.model_selection import KFold, LeaveOneOut, PredefinedSplit
 from tabulate import tabulate
 
 import csv
 import numpy as np
 import os
-import wfdb
 
 
 def _select(lst, idxs):
     return [lst[i] for i in idxs]
 
 
+# evaluator of a worker process, set by _init_worker
+_worker_evaluator = None
+
+def _init_worker(evaluator, store, signal_names, num_threads):
+    """Set up a worker process with an evaluator whose records map their
+    signals from the store.
+    """
+    global _worker_evaluator
+    limit_threads(num_threads)
+    for record, signal_name in zip(evaluator.records, signal_names):
+        record.p_signal = store.get(signal_name)
+    _worker_evaluator = evaluator
+
+def _eval_in_worker(eval_id, detector, train, test):
+    return _worker_evaluator._eval_detector(eval_id, detector, train, test)
+
+
 class Evaluator():
 
     def __init__(
@@ -22,7 +45,18 @@ class Evaluator():
         plot_limit=0,
         save_annotations=False,
         save_model=False,
-        trigger_distance = 5
+        trigger_distance = 5,
+        report_distances=None,
+        beat_types=False,
+        processes=1,
+        threads_per_process=None,
+        record_cache_dir=None,
+        channels=None,
+        signal_dtype=None,
+        lazy_records=False,
+        model_cache_dir=None,
+        detection_cache_dir=None,
+        save_trigger_signals=False
     ):
         """The Evaluator compares different Detectors by first providing them
         with training records and subsequently testing their performace on
@@ -43,6 +77,47 @@ class Evaluator():
             trigger_distance (int, optional): How far (in samples) detected and
                 actual trigger points can be apart from each other to be
                 recognized as 'correctly detected' (true positive).
+            report_distances (list of int, optional): Further trigger
+                distances to report metrics for. They are computed from the
+                same detections.
+            beat_types (bool, optional): If True, the number of beats and the
+                sensitivity per beat class are reported.
+            processes (int, optional): Number of (detector, split)
+                combinations evaluated in parallel by spawned worker processes.
+                Combinations are evaluated one after another in this process if
+                1. Scripts using parallel evaluation must guard their entry
+                point with if __name__ == '__main__'. Detectors are copied to
+                the workers, so they stay untrained in this process.
+            threads_per_process (int, optional): Maximum number of TensorFlow
+                threads per worker process. Cores are shared equally among the
+                workers if unspecified.
+            record_cache_dir (str, optional): Directory to cache parsed
+                records in (see qrsc.utils.recordutils.read_record). Records
+                are parsed from the wfdb files every time if unspecified.
+            channels (list of int, optional): Channels read from the records.
+                All channels are read if unspecified, whether records are
+                cached or not. Detectors only use the first channel read, so
+                [0] suffices for them.
+            signal_dtype (optional): Data type signals are stored as, e.g.
+                np.float32. Signals are float64 if unspecified.
+            lazy_records (bool, optional): If True, record signals are only
+                read when a detector first uses them and dropped again after
+                each (detector, split) combination, so that only the records
+                of one split are held in memory.
+            model_cache_dir (str, optional): Directory to cache trained models
+                in. Detectors are not trained again if a model trained with
+                the same parameters on the same records is cached (see
+                qrsc.utils.cacheutils.ModelCache). Models are always trained
+                if unspecified.
+            detection_cache_dir (str, optional): Directory to cache the
+                detections of deterministic detectors without training in
+                (see qrsc.utils.cacheutils.DetectionCache). Reports show the
+                runtime measured when a detection was cached and whether it
+                was cached. Detection always runs if unspecified.
+            save_trigger_signals (bool, optional): If True, trigger signals
+                are written to output_dir/trigger_signals in half precision.
+                They can be re-thresholded without running the detectors
+                again (see qrsc.utils.storeutils.rethreshold).
         """
         # instance variable set with constructor
         self.input_dir = input_dir
@@ -52,11 +127,23 @@ class Evaluator():
         self.save_annotations = save_annotations
         self.save_model = save_model
         self.trigger_distance = trigger_distance
+        self.save_trigger_signals = save_trigger_signals
+        self.report_distances = report_distances
+        self.beat_types = beat_types
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.record_cache_dir = record_cache_dir
+        self.channels = channels
+        self.signal_dtype = signal_dtype
+        self.lazy_records = lazy_records
+        self.model_cache_dir = model_cache_dir
+        self.detection_cache_dir = detection_cache_dir
 
         # instance variables set later on
         self.detectors = []
         self.records = []
         self.triggers = []
+        self.labels = []
 
         # instance variables having default values
         self.cval = None
@@ -75,16 +162,32 @@ class Evaluator():
             "\tReading {} samples per signal.".format(self.sampto),
             "\tMaximum allowed distance between actual and detected trigger " +
             "points: {} samples".format(self.trigger_distance),
+            "\tFurther reported trigger distances: {}".format(
+                self.report_distances),
+            "\tReporting sensitivity per beat class: {}".format(
+                self.beat_types),
+            "\tParallel evaluation processes: {}".format(self.processes),
+            "\tChannels read: {}".format(self.channels),
+            "\tSignal data type: {}".format(self.signal_dtype),
+            "\tLazy record loading: {}".format(self.lazy_records),
+            "\tModel cache: {}".format(self.model_cache_dir),
+            "\tDetection cache: {}".format(self.detection_cache_dir),
             "\tScikit-learn Cross Validation Method: {}".format(self.cval)])
 
     # PRIVATE DATA ACCESSING HELPERS 
 
     def _read_record(self, record_name):
         record_path = '/'.join([self.input_dir, record_name])
-        record = wfdb.rdrecord(record_path, sampto=self.sampto)
-        annotation = wfdb.rdann(record_path, 'atr', sampto=self.sampto)
-        trigger = trigger_points(annotation)
-        return record, trigger
+        if self.lazy_records:
+            record = LazyRecord(
+                record_path, sampto=self.sampto, channels=self.channels,
+                dtype=self.signal_dtype, cache_dir=self.record_cache_dir)
+            return (record,) + tuple(read_trigger(
+                record_path, sampto=self.sampto, channels=self.channels,
+                dtype=self.signal_dtype, cache_dir=self.record_cache_dir))
+        return read_record(
+            record_path, sampto=self.sampto, channels=self.channels,
+            dtype=self.signal_dtype, cache_dir=self.record_cache_dir)
 
     def _records(self, idxs):
         return _select(self.records, idxs)
@@ -92,6 +195,16 @@ class Evaluator():
     def _triggers(self, idxs):
         return _select(self.triggers, idxs)
 
+    def _labels(self, idxs):
+        return _select(self.labels, idxs)
+
+    def _beat_classes(self):
+        """Beat classes of all records in the order of BEAT_CLASSIFIERS, so
+        that every report has the same columns.
+        """
+        present = set().union(*self.labels)
+        return [label for label in BEAT_CLASSIFIERS if label in present]
+
     # PUBLIC DATA ACCESSING
 
     def add_detectors(self, *detectors):
@@ -99,9 +212,10 @@ class Evaluator():
     
     def add_records(self, *record_names):
         for record_name in record_names:
-            record, trigger = self._read_record(record_name)
+            record, trigger, labels = self._read_record(record_name)
             self.records.append(record)
             self.triggers.append(trigger)
+            self.labels.append(labels)
 
     # PUBLIC EVALUATION INTERFACE
 
@@ -145,12 +259,17 @@ class Evaluator():
 
     def _eval_cross_validator(self):
         reports = self._eval_detectors()
+        # shut down worker pools, detectors restart them if used again
+        for detector in self.detectors:
+            detector.close()
         self._save_header()
         self._save_reports(reports)
         self._print_reports(reports)
         return reports
 
     def _eval_detectors(self):
+        if self.processes > 1:
+            return self._eval_detectors_parallel()
         reports = []
         splits = self.cval.split(self.records)
         combinations = product(self.detectors, splits)
@@ -160,19 +279,75 @@ class Evaluator():
             reports.extend(self._eval_detector(eval_id, detector, train, test))
         return reports
 
+    def _worker_copy(self):
+        """Copy for initializing worker processes, without detectors and
+        record signals.
+        """
+        worker = copy(self)
+        worker.detectors = []
+        # signals are mapped from the store, keep them for all combinations
+        worker.lazy_records = False
+        worker.records = [copy(record) for record in self.records]
+        for record in worker.records:
+            record.p_signal = None
+        return worker
+
+    def _eval_detectors_parallel(self):
+        """Evaluate all combinations in worker processes. Record signals are
+        shared via memory maps and every worker receives the records only
+        once. Reports are in the same order as with serial evaluation.
+        """
+        combinations = list(
+            product(self.detectors, self.cval.split(self.records)))
+        num_threads = (
+            max(cpu_count() // self.processes, 1)
+            if self.threads_per_process is None else self.threads_per_process)
+        store = ArrayStore()
+        try:
+            signal_names = []
+            for record in self.records:
+                signal_names.append(store.put(record.p_signal))
+                if self.lazy_records: record.evict()
+            with ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(
+                        self._worker_copy(), store, signal_names, num_threads)
+            ) as executor:
+                reports = executor.map(
+                    _eval_in_worker,
+                    range(len(combinations)),
+                    [detector for detector, _ in combinations],
+                    [train for _, (train, _) in combinations],
+                    [test for _, (_, test) in combinations])
+                return [entry for report in reports for entry in report]
+        finally:
+            store.close()
+
     def _eval_detector(self, eval_id, detector, train, test):
         evaluation = Evaluation(
             self.output_dir, eval_id, detector,
             self._records(train), self._triggers(train),
             self._records(test), self._triggers(test),
-            self.trigger_distance)
+            self.trigger_distance, self.report_distances,
+            self._labels(test) if self.beat_types else None,
+            self._beat_classes() if self.beat_types else None,
+            None if self.model_cache_dir is None
+            else ModelCache(self.model_cache_dir),
+            None if self.detection_cache_dir is None
+            else DetectionCache(self.detection_cache_dir))
         
         evaluation.run()
 
         if self.save_annotations: evaluation.save_annotations()
         if self.save_model: evaluation.save_model()
+        if self.save_trigger_signals: evaluation.save_trigger_signals()
         if self.plot_limit > 0: evaluation.plot_detections(self.plot_limit)
-        
+        if self.lazy_records:
+            for record in self._records(train) + self._records(test):
+                record.evict()
+
         return evaluation.report()
 
     # SAVING AND PRINTING
@@ -1,3 +1,5 @@
+from .array_store import ArrayStore
+from .batch_feeder import BatchFeeder
 from .window_generator import WindowGenerator
 from .label_generator import LabelGenerator
 from .single_signal_window_generator import SingleSignalWindowGenerator
@@ -0,0 +1,103 @@
+from errno import ENOSPC
+from itertools import count
+from os import getpid, makedirs, remove
+from os.path import basename, exists, isdir, join
+from shutil import disk_usage, rmtree
+from tempfile import gettempdir
+from uuid import uuid4
+
+import numpy as np
+
+# tmpfs mount, i.e. files there live in shared memory
+SHARED_MEMORY_DIR = '/dev/shm'
+
+# free shared memory required to use it, containers often only have 64 MB
+MIN_SHARED_MEMORY = 2**28
+
+# name prefix of arrays written to the disk fallback directory
+FALLBACK_PREFIX = 'disk_'
+
+
+def temp_parent_dir():
+    """Shared memory if it exists and has enough free space, the disk temp
+    directory otherwise.
+    """
+    if isdir(SHARED_MEMORY_DIR) and (
+            disk_usage(SHARED_MEMORY_DIR).free >= MIN_SHARED_MEMORY):
+        return SHARED_MEMORY_DIR
+    return gettempdir()
+
+
+class ArrayStore:
+    """Directory of .npy files that are read as memory maps.
+
+    Generators keep their signals and labels in a store so that worker
+    processes (forked or spawned) map the same pages instead of receiving
+    copies. A pickled store only contains its directory path. The directory is
+    a temporary one, created when the first array is written and removed by
+    the process that created the store.
+
+    The directory is created in shared memory if there is enough of it, on
+    disk otherwise. Arrays that do not fit into shared memory any more are
+    written to a directory of the same name in the disk temp directory.
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            self.directory = join(
+                temp_parent_dir(), 'qrsc-{}'.format(uuid4().hex))
+            self._owner_pid = getpid()
+        else:
+            self.directory = directory
+            self._owner_pid = None
+        self._names = count()
+
+    def __getstate__(self):
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.directory = state['directory']
+        self._owner_pid = None
+        self._names = count()
+
+    def __del__(self):
+        self.close()
+
+    def _fallback_directory(self):
+        return join(gettempdir(), basename(self.directory))
+
+    def _path(self, name):
+        directory = (
+            self._fallback_directory() if name.startswith(FALLBACK_PREFIX)
+            else self.directory)
+        return join(directory, '{}.npy'.format(name))
+
+    def put(self, array):
+        """Write array to the store and return its name."""
+        name = 'array{}_{}'.format(getpid(), next(self._names))
+        array = np.asarray(array)
+        makedirs(self.directory, mode=0o700, exist_ok=True)
+        try:
+            np.save(self._path(name), array)
+            return name
+        except OSError as error:
+            if error.errno != ENOSPC or (
+                    self._fallback_directory() == self.directory):
+                raise
+            if exists(self._path(name)): remove(self._path(name))
+
+        name = FALLBACK_PREFIX + name
+        makedirs(self._fallback_directory(), mode=0o700, exist_ok=True)
+        np.save(self._path(name), array)
+        return name
+
+    def get(self, name):
+        """Read-only memory map of the array stored as name."""
+        return np.load(self._path(name), mmap_mode='r')
+
+    def close(self):
+        """Remove the directory, if this store created it in this process."""
+        if getattr(self, '_owner_pid', None) == getpid():
+            rmtree(self.directory, ignore_errors=True)
+            rmtree(self._fallback_directory(), ignore_errors=True)
+            self._owner_pid = None
@@ -0,0 +1,131 @@
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from os import remove
+from tempfile import mkstemp
+from uuid import uuid4
+import pickle
+
+import numpy as np
+
+from .array_store import temp_parent_dir
+
+# sequence last used in a worker process as (path, sequence)
+_worker_sequence = (None, None)
+
+
+def _load_batch(path, index):
+    """Load a batch in a worker process. The pickled sequence is only read
+    from path and unpickled (and its arrays mapped) once per worker and
+    feeding run.
+    """
+    global _worker_sequence
+    if _worker_sequence[0] != path:
+        with open(path, 'rb') as f:
+            _worker_sequence = (path, pickle.load(f))
+    return _worker_sequence[1][index]
+
+
+class BatchFeeder:
+    """Loads batches of Keras Sequences ahead of time in a pool of workers.
+
+    Other than the enqueuers Keras creates in every fit_generator and
+    predict_generator call, the pool is created once and reused for all
+    sequences fed until the feeder is closed. Closed feeders create a new pool
+    when used again.
+
+    Args:
+        workers (int): Number of worker processes or threads. If 0, batches
+            are loaded in the calling thread.
+        max_queue_size (int): Maximum number of batches loaded ahead.
+        use_multiprocessing (bool): Whether workers are processes or threads.
+    """
+
+    def __init__(self, workers=16, max_queue_size=16, use_multiprocessing=True):
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.use_multiprocessing = use_multiprocessing
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def __del__(self):
+        self.close()
+
+    def pool(self):
+        if self._pool is None:
+            self._pool = (
+                Pool(self.workers) if self.use_multiprocessing
+                else ThreadPool(self.workers))
+        return self._pool
+
+    def close(self):
+        """Shut down the workers."""
+        if getattr(self, '_pool', None) is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def batches(self, sequence, indexes=None):
+        """Generate the batches of sequence in the order given by indexes (all
+        batches in order by default).
+        """
+        indexes = range(len(sequence)) if indexes is None else indexes
+
+        if self.workers == 0:
+            for index in indexes:
+                yield sequence[index]
+            return
+
+        if not self.use_multiprocessing:
+            yield from self._queued(
+                lambda index: self.pool().apply_async(
+                    sequence.__getitem__, (index,)),
+                indexes)
+            return
+
+        # tasks only carry the path, workers read the sequence once per run
+        fd, path = mkstemp(
+            prefix='qrsc-sequence-{}-'.format(uuid4().hex),
+            dir=temp_parent_dir())
+        try:
+            with open(fd, 'wb') as f:
+                pickle.dump(sequence, f)
+            yield from self._queued(
+                lambda index: self.pool().apply_async(
+                    _load_batch, (path, index)),
+                indexes)
+        finally:
+            remove(path)
+
+    def _queued(self, load, indexes):
+        """Results of load for all indexes with at most max_queue_size
+        pending at a time.
+        """
+        pending = deque()
+        for index in indexes:
+            pending.append(load(index))
+            if len(pending) >= max(self.max_queue_size, 1):
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def epochs(self, sequence, epochs, shuffle=False):
+        """Generate the batches of sequence for several epochs, e.g. for
+        fit_generator. Batch order is shuffled per epoch if shuffle is True.
+        """
+        for _ in range(epochs):
+            indexes = (
+                np.random.permutation(len(sequence)) if shuffle
+                else range(len(sequence)))
+            yield from self.batches(sequence, indexes)
+            sequence.on_epoch_end()
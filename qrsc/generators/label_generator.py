@@ -1,27 +1,81 @@
 from keras.utils import Sequence
+import numpy as np
 
-from ..utils.indexutils import index_pairs_for_batch
-from ..utils.triggerutils import points_to_signal
+from .array_store import ArrayStore
+from ..utils.indexutils import chunk_offsets, index_arrays_for_batch
+from ..utils.triggerutils import (
+    points_to_signal_array, points_to_spikes, spike_values)
 
 
 class LabelGenerator(Sequence):
 
     def __init__(
             self, trigger_chunks, chunk_sizes,
-            batch_size, window_size, detection_size
+            batch_size, window_size, detection_size, store=None,
+            sparse=False
     ):
-        self.trigger_signals = [
-            points_to_signal(
-                points=trigger,
-                signal_length=chunk_length,
-                window_size=detection_size)
-            for trigger, chunk_length in zip(trigger_chunks, chunk_sizes)]
+        """Labels for the windows of a WindowGenerator over signal chunks.
+
+        Labels are read from synthesized trigger signals. If sparse is True,
+        only the spikes of the trigger signals are kept and labels are looked
+        up among them instead.
+        """
+        self.chunk_starts = np.concatenate(
+            ([0], np.cumsum(chunk_sizes, dtype=int)[:-1]))
+        self.sparse = sparse
+        if sparse:
+            # all chunks' spikes ordered by begin, positions as in the
+            # concatenated trigger signal
+            spikes = [
+                points_to_spikes(trigger, chunk_length, detection_size)
+                for trigger, chunk_length in zip(trigger_chunks, chunk_sizes)]
+            self.spike_begins = np.concatenate([np.zeros(0, dtype=int)] + [
+                begins + start
+                for (begins, _), start in zip(spikes, self.chunk_starts)])
+            self.spike_ends = np.concatenate([np.zeros(0, dtype=int)] + [
+                ends + start
+                for (_, ends), start in zip(spikes, self.chunk_starts)])
+            self.store = store
+            self.trigger_signal_name = None
+            self.trigger_signal = None
+        else:
+            self.store = ArrayStore() if store is None else store
+            # all chunks' trigger signals in one compact array, chunk i
+            # starts at sample chunk_starts[i]
+            trigger_signal = np.concatenate(
+                [np.zeros(0, dtype=np.uint8)] + [
+                    points_to_signal_array(
+                        trigger, chunk_length, detection_size, np.uint8)
+                    for trigger, chunk_length
+                    in zip(trigger_chunks, chunk_sizes)])
+            self.trigger_signal_name = self.store.put(trigger_signal)
+            self.trigger_signal = self.store.get(self.trigger_signal_name)
         self.chunk_sizes = chunk_sizes
         self.batch_size = batch_size
         self.window_size = window_size
+        self.offsets = chunk_offsets(window_size, chunk_sizes)
+
+    def __getstate__(self):
+        """Worker processes only receive the store location and indexes."""
+        state = self.__dict__.copy()
+        del state['trigger_signal']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.trigger_signal = (
+            None if self.sparse
+            else self.store.get(self.trigger_signal_name))
+
+    def __values(self, positions):
+        """Trigger signal values at positions of the concatenated chunks."""
+        if self.sparse:
+            return spike_values(
+                self.spike_begins, self.spike_ends, positions).astype(np.uint8)
+        return self.trigger_signal[positions]
 
     def __check_index(self, chunk_index, window_index):
-        if chunk_index not in range(0, len(self.trigger_signals)):
+        if chunk_index not in range(0, len(self.chunk_sizes)):
             raise IndexError("Chunk index out of bounds.")
 
         chunk_length = self.chunk_sizes[chunk_index]
@@ -29,25 +83,56 @@ class LabelGenerator(Sequence):
         if window_index not in range(0, chunk_length - self.window_size + 1):
             raise IndexError("Window index out of bounds.")
 
+    def __check_index_arrays(self, chunk_indexes, window_indexes):
+        if np.any((chunk_indexes < 0) | (chunk_indexes >= len(self.chunk_sizes))):
+            raise IndexError("Chunk index out of bounds.")
+
+        usable_chunk_lengths = np.diff(self.offsets)[chunk_indexes]
+
+        if np.any((window_indexes < 0) | (window_indexes >= usable_chunk_lengths)):
+            raise IndexError("Window index out of bounds.")
+
+    def index_arrays_for_batch(self, batch_index):
+        return index_arrays_for_batch(
+            batch_index, self.batch_size, self.offsets)
+
     def index_pairs_for_batch(self, batch_index):
-        return index_pairs_for_batch(
-            batch_index, self.batch_size, self.window_size, self.chunk_sizes)
+        chunk_indexes, window_indexes = self.index_arrays_for_batch(batch_index)
+        return list(zip(chunk_indexes.tolist(), window_indexes.tolist()))
 
     def label(self, chunk_index, window_index):
         self.__check_index(chunk_index, window_index)
-        trigger_signal = self.trigger_signals[chunk_index]
-        return trigger_signal[window_index + self.window_size // 2]
+        return self.__values(
+            self.chunk_starts[chunk_index]
+            + window_index + self.window_size // 2)
+
+    def gather(self, chunk_indexes, window_indexes):
+        """Labels for the given index arrays, read from the trigger signal
+        with one fancy-index operation.
+        """
+        chunk_indexes = np.asarray(chunk_indexes, dtype=int)
+        window_indexes = np.asarray(window_indexes, dtype=int)
+        self.__check_index_arrays(chunk_indexes, window_indexes)
+        return self.__values(
+            self.chunk_starts[chunk_indexes]
+            + window_indexes + self.window_size // 2)
+
+    def labels(self, index_pairs, as_array=False):
+        chunk_indexes, window_indexes = (
+            np.array(index_pairs, dtype=int).reshape(-1, 2).T)
+        labels = self.gather(chunk_indexes, window_indexes)
+        if as_array:
+            return labels
+        return labels.tolist()
 
-    def labels(self, index_pairs):
-        return [
-            self.label(chunk_index, window_index)
-            for chunk_index, window_index in index_pairs]
+    def batch(self, batch_index, as_array=False):
+        labels = self.gather(*self.index_arrays_for_batch(batch_index))
+        if as_array:
+            return labels
+        return labels.tolist()
 
     def __getitem__(self, index):
-        return self.labels(self.index_pairs_for_batch(index))
+        return self.batch(index)
 
     def __len__(self):
-        num_labels = sum([
-            chunk_length - self.window_size + 1
-            for chunk_length in self.chunk_sizes])
-        return num_labels // self.batch_size
+        return int(self.offsets[-1]) // self.batch_size
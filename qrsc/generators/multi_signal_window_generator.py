@@ -1,18 +1,21 @@
 from keras.utils import Sequence
 
 from . import LabelGenerator, WindowGenerator
-from ..utils.indexutils import rescale
+from .array_store import ArrayStore
+from ..utils.indexutils import rescale_indexes
 
 
 class MultiSignalWindowGenerator(Sequence):
 
     def __init__(
             self, signals, batch_size, window_sizes,
-            trigger_chunks=None, detection_size=None, wrap_samples=False
+            trigger_chunks=None, detection_size=None, wrap_samples=False,
+            store=None, partial_batch=False, sparse_labels=True
     ):
+        store = ArrayStore() if store is None else store
         self.window_generators = [
             WindowGenerator(signal, batch_size,
-                            window_size, wrap_samples)
+                            window_size, wrap_samples, store, partial_batch)
             for signal, window_size in zip(signals, window_sizes)]
 
         self.ref_window_generator = self.window_generators[0]
@@ -24,16 +27,20 @@ class MultiSignalWindowGenerator(Sequence):
                 chunk_sizes=[len(chunk) for chunk in signals[0]],
                 batch_size=batch_size,
                 window_size=window_sizes[0],
-                detection_size=detection_size if detection_size else window_sizes[0])
+                detection_size=detection_size if detection_size else window_sizes[0],
+                store=store,
+                sparse=sparse_labels)
             if trigger_chunks is not None else None)
 
     def __getitem__(self, index):
-        index_pairs = self.ref_window_generator.index_pairs_for_batch(index)
+        chunk_indexes, window_indexes = (
+            self.ref_window_generator.index_arrays_for_batch(index))
 
         window_batches = [
-            gen.windows(
-                rescale(index_pairs, self.ref_window_size, gen.window_size),
-                as_array=True)
+            gen.gather(
+                chunk_indexes,
+                rescale_indexes(
+                    window_indexes, self.ref_window_size, gen.window_size))
             for gen in self.window_generators]
 
         if self.labels is None:
@@ -1,23 +1,28 @@
 from keras.utils import Sequence
 
 from . import LabelGenerator, WindowGenerator
+from .array_store import ArrayStore
 
 
 class SingleSignalWindowGenerator(Sequence):
 
     def __init__(
             self, signal_chunks, batch_size, window_size,
-            trigger_chunks=None, detection_size=None, wrap_samples=False
+            trigger_chunks=None, detection_size=None, wrap_samples=False,
+            store=None, sparse_labels=True
     ):
+        store = ArrayStore() if store is None else store
         self.windows = WindowGenerator(
-            signal_chunks, batch_size, window_size, wrap_samples)
+            signal_chunks, batch_size, window_size, wrap_samples, store)
         self.labels = (
             LabelGenerator(
                 trigger_chunks=trigger_chunks,
                 chunk_sizes=[len(chunk) for chunk in signal_chunks],
                 batch_size=batch_size,
                 window_size=window_size,
-                detection_size=detection_size if detection_size else window_size)
+                detection_size=detection_size if detection_size else window_size,
+                store=store,
+                sparse=sparse_labels)
             if trigger_chunks is not None else None)
 
     def __getitem__(self, index):
@@ -1,23 +1,73 @@
 from keras.utils import Sequence
 import numpy as np
 
-from ..utils.indexutils import index_pairs_for_batch
+from .array_store import ArrayStore
+from ..utils.indexutils import chunk_offsets, index_arrays_for_batch
+from ..utils.signalutils import sliding_windows
 
 
 class WindowGenerator(Sequence):
 
     def __init__(
-            self, signal_chunks, batch_size, window_size, wrap_samples=False
+            self, signal_chunks, batch_size, window_size, wrap_samples=False,
+            store=None, partial_batch=False
     ):
         self.signal_chunks = signal_chunks
         self.batch_size = batch_size
         self.window_size = window_size
         self.wrap_samples = wrap_samples
-
-    def __as_array(self, windows):
-        windows = np.array(windows)
+        # whether the windows left over after the last full batch form a
+        # smaller batch of their own
+        self.partial_batch = partial_batch
+        self.chunk_sizes = [len(chunk) for chunk in signal_chunks]
+        self.offsets = chunk_offsets(window_size, self.chunk_sizes)
+
+        # all chunks in one array, written to the store only when the
+        # generator is sent to worker processes, see __getstate__
+        self.store = store
+        self.samples_name = None
+        if len(signal_chunks) == 1:
+            self.samples = np.asarray(signal_chunks[0])
+        else:
+            self.samples = (
+                np.concatenate([np.asarray(chunk) for chunk in signal_chunks])
+                if signal_chunks else np.zeros(0))
+        self.__map_samples(self.samples)
+
+    def __getstate__(self):
+        """Worker processes only receive the store location and indexes.
+        Samples are written to the store on the first pickling, and samples
+        and window views are mapped again from the store.
+        """
+        if self.samples_name is None:
+            if self.store is None:
+                self.store = ArrayStore()
+            self.samples_name = self.store.put(self.samples)
+        state = self.__dict__.copy()
+        del state['samples']
+        del state['signal_chunks']
+        del state['chunk_windows']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.samples = self.store.get(self.samples_name)
+        self.signal_chunks = None
+        self.__map_samples(self.samples)
+
+    def __map_samples(self, samples):
+        chunk_starts = np.concatenate(([0], np.cumsum(self.chunk_sizes, dtype=int)))
+        chunks = [
+            samples[start:end]
+            for start, end in zip(chunk_starts[:-1], chunk_starts[1:])]
+        if self.signal_chunks is None:
+            self.signal_chunks = chunks
+        self.chunk_windows = [
+            sliding_windows(chunk, self.window_size) for chunk in chunks]
+
+    def __wrap(self, windows):
         if self.wrap_samples:
-            windows.shape = (len(windows), self.window_size, 1)
+            return windows[:, :, np.newaxis]
         return windows
 
     def __adjust_chunk_index(self, chunk_index):
@@ -28,8 +78,8 @@ class WindowGenerator(Sequence):
             chunk_index, 0, len(self.signal_chunks)))
 
     def __adjust_window_index(self, chunk_index, window_index):
-        chunk = self.signal_chunks[chunk_index]
-        usable_chunk_length = len(chunk) - self.window_size + 1
+        chunk_length = self.chunk_sizes[chunk_index]
+        usable_chunk_length = chunk_length - self.window_size + 1
         
         if window_index in range(usable_chunk_length):
             return window_index
@@ -50,10 +100,42 @@ class WindowGenerator(Sequence):
         window_index = self.__adjust_window_index(chunk_index, window_index)
         return chunk_index, window_index
 
+    def __adjust_index_arrays(self, chunk_index, chunk_window_indexes):
+        """Vectorized counterpart of __adjust_window_index for all windows of
+        a batch that lie in the same chunk.
+        """
+        usable_chunk_length = len(self.chunk_windows[chunk_index])
+        invalid = (
+            (chunk_window_indexes < 0)
+            | (chunk_window_indexes > usable_chunk_length))
+        if invalid.any():
+            raise IndexError(
+                "Window index {} out of bounds [{},{}] in chunk {}.".format(
+                    chunk_window_indexes[invalid][0], 0, usable_chunk_length,
+                    chunk_index))
+        return np.where(
+            chunk_window_indexes == usable_chunk_length,
+            chunk_window_indexes - 1, chunk_window_indexes)
+
+    def __gather_chunk(self, chunk_index, chunk_window_indexes):
+        windows = self.chunk_windows[chunk_index]
+        chunk_window_indexes = self.__adjust_index_arrays(
+            chunk_index, chunk_window_indexes)
+        start = chunk_window_indexes[0]
+        if np.array_equal(
+                chunk_window_indexes,
+                np.arange(start, start + len(chunk_window_indexes))):
+            # consecutive windows: a slice of the strided view, no copy
+            return windows[start:start + len(chunk_window_indexes)]
+        return windows[chunk_window_indexes]
+
+    def index_arrays_for_batch(self, batch_index):
+        return index_arrays_for_batch(
+            batch_index, self.batch_size, self.offsets, self.partial_batch)
+
     def index_pairs_for_batch(self, batch_index):
-        return index_pairs_for_batch(
-            batch_index, self.batch_size, self.window_size,
-            chunk_sizes=[len(chunk) for chunk in self.signal_chunks])
+        chunk_indexes, window_indexes = self.index_arrays_for_batch(batch_index)
+        return list(zip(chunk_indexes.tolist(), window_indexes.tolist()))
 
     def window(self, chunk_index, window_index):
         chunk_index, window_index = self.__adjust_indexes(chunk_index, window_index)
@@ -64,24 +146,51 @@ class WindowGenerator(Sequence):
 
         return chunk[start:end]
 
-    def windows(self, index_pairs, as_array=False):
-        windows = [
-            self.window(chunk_index, window_index)
-            for chunk_index, window_index in index_pairs]
+    def gather(self, chunk_indexes, window_indexes):
+        """Windows for the given index arrays as one array. Windows are taken
+        from strided views on the signal chunks, i.e. consecutive windows of a
+        single chunk are returned as a view and all other windows are gathered
+        with one fancy-index operation per chunk.
+        """
+        chunk_indexes = np.asarray(chunk_indexes, dtype=int)
+        window_indexes = np.asarray(window_indexes, dtype=int)
+
+        used_chunks = np.unique(chunk_indexes)
+        for chunk_index in used_chunks:
+            self.__adjust_chunk_index(chunk_index)
+
+        if len(used_chunks) == 1:
+            return self.__wrap(
+                self.__gather_chunk(used_chunks[0], window_indexes))
+
+        windows = np.empty(
+            (len(window_indexes), self.window_size),
+            dtype=self.chunk_windows[0].dtype if self.chunk_windows else float)
+        for chunk_index in used_chunks:
+            in_chunk = chunk_indexes == chunk_index
+            windows[in_chunk] = self.__gather_chunk(
+                chunk_index, window_indexes[in_chunk])
+        return self.__wrap(windows)
 
+    def windows(self, index_pairs, as_array=False):
         if as_array:
-            return self.__as_array(windows)
+            chunk_indexes, window_indexes = (
+                np.array(index_pairs, dtype=int).reshape(-1, 2).T)
+            return self.gather(chunk_indexes, window_indexes)
 
-        return windows
+        return [
+            self.window(chunk_index, window_index)
+            for chunk_index, window_index in index_pairs]
 
     def batch(self, batch_index, as_array=False):
-        return self.windows(self.index_pairs_for_batch(batch_index), as_array)
+        if as_array:
+            return self.gather(*self.index_arrays_for_batch(batch_index))
+        return self.windows(self.index_pairs_for_batch(batch_index))
 
     def __getitem__(self, index):
         return self.batch(index, as_array=True)
 
     def __len__(self):
-        num_windows = sum([
-            len(chunk) - self.window_size + 1
-            for chunk in self.signal_chunks])
-        return num_windows // self.batch_size
+        if self.partial_batch:
+            return -(-int(self.offsets[-1]) // self.batch_size)
+        return int(self.offsets[-1]) // self.batch_size
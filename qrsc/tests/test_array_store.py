@@ -0,0 +1,96 @@
+from errno import ENOSPC
+from os import getpid
+from os.path import exists
+from unittest.mock import patch
+import pickle
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+from qrsc.generators import ArrayStore, LabelGenerator, WindowGenerator
+
+SIGNAL_CHUNKS = [
+    [0.9, 0.4, 0.1, 0.2, 0.6, 0.0, 0.3, 0.5, 0.0, 0.4],
+    [0.5, 0.0, 0.2, 0.5, 0.8, 0.4, 0.2, 0.4, 0.1, 0.0, 0.7, 0.2]]
+
+
+class TestArrayStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ArrayStore()
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_put_and_get(self):
+        """Stored arrays are read back as read-only memory maps."""
+        name = self.store.put(np.arange(5))
+        array = self.store.get(name)
+        self.assertIsInstance(array, np.memmap)
+        self.assertFalse(array.flags.writeable)
+        npt.assert_array_equal(array, np.arange(5))
+
+    def test_pickle(self):
+        """Pickled stores only refer to the directory and do not remove it."""
+        name = self.store.put(np.arange(5))
+        copied_store = pickle.loads(pickle.dumps(self.store))
+        npt.assert_array_equal(copied_store.get(name), np.arange(5))
+        copied_store.close()
+        self.assertTrue(exists(self.store.directory))
+        self.store.close()
+        self.assertFalse(exists(self.store.directory))
+
+    def test_pickle_generator(self):
+        """Generators are pickled without their samples but produce the same
+        batches afterwards.
+        """
+        signal = np.random.rand(100000)
+        generator = WindowGenerator(
+            [signal], batch_size=2, window_size=4, store=self.store)
+        payload = pickle.dumps(generator)
+        self.assertLess(len(payload), signal.nbytes // 100)
+        npt.assert_array_equal(pickle.loads(payload)[7], generator[7])
+
+        generator = WindowGenerator(
+            SIGNAL_CHUNKS, batch_size=2, window_size=4, store=self.store)
+        copied_generator = pickle.loads(pickle.dumps(generator))
+        for index in range(len(generator)):
+            npt.assert_array_equal(copied_generator[index], generator[index])
+
+    def test_written_when_pickled(self):
+        """Stores create no directory before the first array is written, and
+        generators only write their samples when sent to worker processes.
+        """
+        self.assertFalse(exists(self.store.directory))
+        generator = WindowGenerator(
+            SIGNAL_CHUNKS, batch_size=2, window_size=4, store=self.store)
+        labels = LabelGenerator(
+            [[3], [5]], [len(chunk) for chunk in SIGNAL_CHUNKS],
+            batch_size=2, window_size=4, detection_size=2, sparse=True)
+        self.assertIsNone(labels.store)
+        self.assertFalse(exists(self.store.directory))
+        pickle.dumps(generator)
+        pickle.dumps(generator)
+        self.assertEqual(self.store.get(generator.samples_name).shape, (22,))
+        self.assertEqual(generator.samples_name, 'array{}_0'.format(getpid()))
+
+    def test_fallback(self):
+        """Arrays not fitting into the store directory are written to disk
+        and found by pickled copies of the store.
+        """
+        if self.store._fallback_directory() == self.store.directory:
+            self.skipTest("store is on disk already")
+        save = np.save
+
+        def full(path, array):
+            if not path.startswith(self.store._fallback_directory()):
+                raise OSError(ENOSPC, 'No space left on device')
+            save(path, array)
+
+        with patch('numpy.save', full):
+            name = self.store.put(np.arange(5))
+        copied_store = pickle.loads(pickle.dumps(self.store))
+        npt.assert_array_equal(copied_store.get(name), np.arange(5))
+        self.store.close()
+        self.assertFalse(exists(self.store._fallback_directory()))
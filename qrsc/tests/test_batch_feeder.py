@@ -0,0 +1,62 @@
+from glob import glob
+from os.path import join
+import unittest
+
+import numpy.testing as npt
+
+from qrsc.generators import BatchFeeder, WindowGenerator
+from qrsc.generators.array_store import temp_parent_dir
+
+SIGNAL_CHUNKS = [
+    [0.9, 0.4, 0.1, 0.2, 0.6, 0.0, 0.3, 0.5, 0.0, 0.4],
+    [0.5, 0.0, 0.2, 0.5, 0.8, 0.4, 0.2, 0.4, 0.1, 0.0, 0.7, 0.2]]
+
+
+class TestBatchFeeder(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = WindowGenerator(SIGNAL_CHUNKS, 2, 3)
+
+    def assert_batches_equal(self, feeder, indexes=None):
+        expected_indexes = (
+            range(len(self.generator)) if indexes is None else indexes)
+        batches = list(feeder.batches(self.generator, indexes))
+        self.assertEqual(len(batches), len(expected_indexes))
+        for batch, index in zip(batches, expected_indexes):
+            npt.assert_array_equal(batch, self.generator[index])
+
+    def test_batches(self):
+        """Batches are fed in order by processes, threads and in place."""
+        for use_multiprocessing in [True, False]:
+            with BatchFeeder(2, 3, use_multiprocessing) as feeder:
+                self.assert_batches_equal(feeder)
+                self.assert_batches_equal(feeder, [4, 0, 2])
+        self.assert_batches_equal(BatchFeeder(workers=0))
+
+    def test_pool_reused(self):
+        """The pool outlives single feeding runs and is restarted on demand."""
+        feeder = BatchFeeder(2, 3)
+        self.assert_batches_equal(feeder)
+        pool = feeder.pool()
+        self.assert_batches_equal(feeder)
+        self.assertIs(feeder.pool(), pool)
+        feeder.close()
+        self.assert_batches_equal(feeder)
+        self.assertIsNot(feeder.pool(), pool)
+        feeder.close()
+
+    def test_epochs(self):
+        """Every epoch feeds every batch once."""
+        with BatchFeeder(2, 3) as feeder:
+            batches = list(feeder.epochs(self.generator, 3, shuffle=True))
+        self.assertEqual(len(batches), 3 * len(self.generator))
+
+    def test_sequence_file_removed(self):
+        """Processes read the sequence from a file that is removed after the
+        feeding run.
+        """
+        pattern = join(temp_parent_dir(), 'qrsc-sequence-*')
+        before = set(glob(pattern))
+        with BatchFeeder(2, 3) as feeder:
+            self.assert_batches_equal(feeder)
+        self.assertSetEqual(set(glob(pattern)), before)
@@ -0,0 +1,109 @@
+from os.path import dirname
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import wfdb
+
+from qrsc.detectors import PanTompkinsDetector
+from qrsc.utils.annotationutils import trigger_points
+from qrsc.utils import cacheutils as cu
+
+THIS_DIR = dirname(__file__)
+RECORD_DIR = '/'.join([THIS_DIR, 'records'])
+RECORD_NAMES = ['100', '101']
+
+
+class TestCacheUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            wfdb.rdrecord('/'.join([RECORD_DIR, name]))
+            for name in RECORD_NAMES]
+        self.triggers = [
+            trigger_points(
+                wfdb.rdann('/'.join([RECORD_DIR, name]), extension='atr'))
+            for name in RECORD_NAMES]
+
+    def test_array_digest(self):
+        array = np.arange(10, dtype=np.float64)
+        self.assertEqual(cu.array_digest(array), cu.array_digest(array.copy()))
+        self.assertEqual(
+            cu.array_digest(array[::2]), cu.array_digest(array[::2].copy()))
+        self.assertNotEqual(
+            cu.array_digest(array), cu.array_digest(array.astype(np.float32)))
+        self.assertNotEqual(
+            cu.array_digest(array), cu.array_digest(array.reshape(2, 5)))
+        changed = array.copy()
+        changed[3] += 1e-9
+        self.assertNotEqual(cu.array_digest(array), cu.array_digest(changed))
+
+    def test_records_digest(self):
+        digest = cu.records_digest(self.records, self.triggers)
+        self.assertEqual(
+            digest, cu.records_digest(self.records, list(self.triggers)))
+        self.assertNotEqual(
+            digest,
+            cu.records_digest(self.records[::-1], self.triggers[::-1]))
+        self.assertNotEqual(
+            digest,
+            cu.records_digest(
+                self.records, [self.triggers[0][1:], self.triggers[1]]))
+
+    def test_model_cache_unsupported(self):
+        cache_dir = mkdtemp()
+        try:
+            cache = cu.ModelCache(cache_dir)
+            self.assertFalse(cache.supports(object()))
+            self.assertFalse(cache.load(object(), 'missing'))
+        finally:
+            rmtree(cache_dir)
+
+    def test_cache_version(self):
+        """Keys should change with the cache version."""
+        detector = PanTompkinsDetector(name='MyPT', window_size=30)
+        detection_cache = cu.DetectionCache()
+        model_cache = cu.ModelCache()
+        # model_params of a detector whose training is cached
+        detector.model_params = lambda: {'window_size': 30}
+        keys = (
+            detection_cache.key(detector, self.records[0]),
+            model_cache.key(detector, self.records, self.triggers))
+        with patch.object(cu, 'CACHE_VERSION', cu.CACHE_VERSION + 1):
+            self.assertNotEqual(
+                keys[0], detection_cache.key(detector, self.records[0]))
+            self.assertNotEqual(
+                keys[1],
+                model_cache.key(detector, self.records, self.triggers))
+
+    def test_detection_cache(self):
+        cache_dir = mkdtemp()
+        try:
+            cache = cu.DetectionCache(cache_dir)
+            detector = PanTompkinsDetector(name='MyPT', window_size=30)
+            self.assertTrue(cache.supports(detector))
+            key = cache.key(detector, self.records[0])
+            self.assertEqual(
+                key,
+                cache.key(
+                    PanTompkinsDetector(name='OtherPT', window_size=30),
+                    self.records[0]))
+            self.assertNotEqual(
+                key,
+                cache.key(
+                    PanTompkinsDetector(name='MyPT', window_size=31),
+                    self.records[0]))
+            self.assertNotEqual(key, cache.key(detector, self.records[1]))
+
+            self.assertIsNone(cache.load(key))
+            trigger, trigger_signal = detector.trigger_and_signal(
+                self.records[0])
+            cache.save(key, trigger, trigger_signal, 1.5)
+            cached_trigger, cached_signal, runtime = cache.load(key)
+            np.testing.assert_array_equal(cached_trigger, trigger)
+            np.testing.assert_array_equal(cached_signal, trigger_signal)
+            self.assertEqual(runtime, 1.5)
+        finally:
+            rmtree(cache_dir)
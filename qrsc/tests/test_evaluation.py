@@ -5,12 +5,14 @@ from os.path import dirname, exists
 from shutil import rmtree
 import sys
 import unittest
+from unittest.mock import patch
 
 import wfdb
 
 from qrsc.utils.annotationutils import trigger_points
 from qrsc.evaluation import Evaluation
-from qrsc.detectors import GarciaBerdonesDetector
+from qrsc.utils.cacheutils import DetectionCache, ModelCache
+from qrsc.detectors import GarciaBerdonesDetector, PanTompkinsDetector
 
 THIS_DIR = dirname(__file__)
 GENERATED_DIR = '/'.join([THIS_DIR, 'generated'])
@@ -38,10 +40,11 @@ class TestEvaluation(unittest.TestCase):
         cls.test_records = [
              wfdb.rdrecord('/'.join([RECORD_DIR, name]))
             for name in TEST_RECORD_NAMES]
-        cls.test_triggers = [
+        cls.test_triggers, cls.test_labels = map(list, zip(*[
             trigger_points(
-                wfdb.rdann('/'.join([RECORD_DIR, name]), extension='atr'))
-            for name in TEST_RECORD_NAMES]
+                wfdb.rdann('/'.join([RECORD_DIR, name]), extension='atr'),
+                with_labels=True)
+            for name in TEST_RECORD_NAMES]))
         
         cls.evaluation = Evaluation(
             output_dir=GENERATED_DIR,
@@ -51,7 +54,9 @@ class TestEvaluation(unittest.TestCase):
             train_triggers=cls.train_triggers,
             test_records=cls.test_records,
             test_triggers=cls.test_triggers,
-            trigger_distance=5)
+            trigger_distance=5,
+            report_distances=[5, 10],
+            test_labels=cls.test_labels)
 
         capture = StringIO()
         sys.stdout = capture
@@ -72,6 +77,29 @@ class TestEvaluation(unittest.TestCase):
         for entry in report:
             self.assertIsInstance(entry, OrderedDict)
 
+    def test_report_distances(self):
+        """Metrics for further trigger distances should be reported next to
+        the default ones and equal them for the same distance.
+        """
+        for entry in self.evaluation.report():
+            for key in ['TP', 'FP', 'FN', 'Sensitivity', 'PPV', 'F1']:
+                self.assertEqual(entry[key + '@5'], entry[key])
+                self.assertIn(key + '@10', entry)
+            self.assertGreaterEqual(entry['TP@10'], entry['TP'])
+
+    def test_beat_types(self):
+        """Beats per class should add up to all beats of a record."""
+        report = self.evaluation.report()
+        classes = self.evaluation.beat_classes
+        for entry, labels in zip(report, self.test_labels):
+            self.assertEqual(
+                sum(entry['Beats {}'.format(c)] for c in classes),
+                len(labels))
+        self.assertEqual(
+            sum(report[-1]['Beats {}'.format(c)] for c in classes),
+            sum(map(len, self.test_labels)))
+        self.assertIn('Sensitivity N', report[-1])
+
     def test_save_annotations(self):
         records = self.test_records
         triggers = self.evaluation.detected_triggers
@@ -83,6 +111,15 @@ class TestEvaluation(unittest.TestCase):
             file_name = self.evaluation._file_name_for(record)
             self.assertTrue(exists('{}/{}.atr'.format(GENERATED_DIR, file_name)))
 
+    def test_save_trigger_signals(self):
+        self.evaluation.save_trigger_signals()
+        file_name = self.evaluation._file_name()
+        directory = '{}/trigger_signals'.format(GENERATED_DIR)
+        self.assertTrue(exists('{}/{}.json'.format(directory, file_name)))
+        for record in self.test_records:
+            self.assertTrue(exists('{}/{}.npy'.format(
+                directory, self.evaluation._file_name_for(record))))
+
     def test_save_model(self):
         self.evaluation.save_model()
         file_name = self.evaluation._file_name()
@@ -93,3 +130,89 @@ class TestEvaluation(unittest.TestCase):
         for record in self.test_records:
             file_name = self.evaluation._file_name_for(record)
             self.assertTrue(exists('{}/{}.svg'.format(GENERATED_DIR, file_name)))
+
+    def test_model_cache(self):
+        """A second evaluation of the same detector on the same training
+        records should load the cached model instead of training.
+        """
+        cache = ModelCache('/'.join([GENERATED_DIR, 'models']))
+        detector = GarciaBerdonesDetector(
+            name='MyCachedGBD', batch_size=32, window_size=20)
+        evaluations = [
+            Evaluation(
+                output_dir=GENERATED_DIR,
+                evaluation_id=eval_id,
+                detector=detector,
+                train_records=self.train_records,
+                train_triggers=self.train_triggers,
+                test_records=self.test_records,
+                test_triggers=self.test_triggers,
+                trigger_distance=5,
+                model_cache=cache)
+            for eval_id in range(2)]
+
+        capture = StringIO()
+        sys.stdout = capture
+        evaluations[0].run()
+        weights = detector.model.get_weights()
+        evaluations[1].run()
+        sys.stdout = sys.__stdout__
+
+        self.assertFalse(evaluations[0].model_loaded)
+        self.assertTrue(evaluations[1].model_loaded)
+        for trained, loaded in zip(weights, detector.model.get_weights()):
+            self.assertTrue((trained == loaded).all())
+
+    def test_detection_cache(self):
+        """A second evaluation of a deterministic detector should report the
+        cached detections with their original runtimes.
+        """
+        cache = DetectionCache('/'.join([GENERATED_DIR, 'detections']))
+        detector = PanTompkinsDetector(name='MyPT', window_size=30)
+        reports = []
+        for eval_id in range(2):
+            evaluation = Evaluation(
+                output_dir=GENERATED_DIR,
+                evaluation_id=eval_id,
+                detector=detector,
+                train_records=self.train_records,
+                train_triggers=self.train_triggers,
+                test_records=self.test_records,
+                test_triggers=self.test_triggers,
+                trigger_distance=5,
+                detection_cache=cache)
+            evaluation.run()
+            reports.append(evaluation.report())
+
+        for computed, cached in zip(*reports):
+            self.assertFalse(computed['Cached Detection'])
+            self.assertTrue(cached['Cached Detection'])
+            for key in ['TP', 'FP', 'FN', 'Detection Runtime']:
+                self.assertEqual(computed[key], cached[key])
+
+    def test_detection_cache_runtime(self):
+        """The runtime measured for each record should be cached and reported
+        for that record.
+        """
+        cache = DetectionCache('/'.join([GENERATED_DIR, 'runtimes']))
+        detector = PanTompkinsDetector(name='MyPT', window_size=30)
+        runtimes = []
+        # start and end time of every record's detection
+        times = [0., 1., 10., 12., 20., 23.]
+        for eval_id in range(2):
+            evaluation = Evaluation(
+                output_dir=GENERATED_DIR,
+                evaluation_id=eval_id,
+                detector=detector,
+                train_records=self.train_records,
+                train_triggers=self.train_triggers,
+                test_records=self.test_records,
+                test_triggers=self.test_triggers,
+                trigger_distance=5,
+                detection_cache=cache)
+            with patch('qrsc.evaluation.time', side_effect=times):
+                evaluation.run()
+            runtimes.append(evaluation.runtimes)
+
+        self.assertListEqual(runtimes[0], [1., 2., 3.])
+        self.assertListEqual(runtimes[1], [1., 2., 3.])
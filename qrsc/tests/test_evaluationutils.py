@@ -17,9 +17,49 @@ class TestEvaluationUtils(unittest.TestCase):
             [11, 30, 33, 36, 40]
         ]
         tolerance = 5
-        self.assertEqual(
-            eu.triggers_metrics(true, pred, tolerance),
-            (7, 0, 6, 5))
+        self.assertListEqual(
+            eu.triggers_metrics(true, pred, tolerance).tolist(),
+            [7, 0, 6, 5])
+
+    def test_merge(self):
+        merged = list(eu.merge([10, 55, 80], [11, 8, 12, 85, 30], 3))
+        self.assertListEqual(merged[:3], [
+            (10, 11, 'TP'), (10, 8, 'FP'), (10, 12, 'FP')])
+        self.assertEqual(merged[3][0], 55)
+        self.assertTrue(math.isnan(merged[3][1]))
+        self.assertEqual(merged[3][2], 'FN')
+        self.assertEqual(merged[4][0], 80)
+        self.assertTrue(math.isnan(merged[4][1]))
+        self.assertTrue(math.isnan(merged[5][0]))
+        self.assertEqual(merged[5][1:], (85, 'FP'))
+        self.assertTrue(math.isnan(merged[6][0]))
+        self.assertEqual(merged[6][1:], (30, 'FP'))
+
+    def test_metrics_table(self):
+        true = [
+            [10, 55, 80, 100],
+            [25, 70, 92]
+        ]
+        pred = [
+            [10, 11, 85, 95, 106],
+            [11, 26, 65]
+        ]
+        tolerances = [0, 5, 20]
+        table = eu.metrics_table(true, pred, tolerances)
+        self.assertEqual(table.shape, (2, 3, 4))
+        for record, (t, p) in enumerate(zip(true, pred)):
+            for idx, tolerance in enumerate(tolerances):
+                self.assertTupleEqual(
+                    tuple(table[record, idx].tolist()),
+                    eu.trigger_metrics(t, p, tolerance))
+        self.assertEqual(eu.metrics_table(true, pred, []).shape, (2, 0, 4))
+
+    def test_beat_type_counts(self):
+        beats, tp = eu.beat_type_counts(
+            [10, 20, 30, 40], ['N', 'V', 'N', 'A'], [11, 41, 70], 2,
+            ['N', 'A', 'V', 'L'])
+        self.assertListEqual(beats.tolist(), [2, 1, 1, 0])
+        self.assertListEqual(tp.tolist(), [1, 1, 0, 0])
 
     def test_sensitivity(self):
         self.assertEqual(eu.sensitivity(3, 7), 0.3)
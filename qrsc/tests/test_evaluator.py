@@ -62,3 +62,38 @@ class TestEvaluator(unittest.TestCase):
         self.assertIn('.svg', file_extensions)
         self.assertIn('.h5', file_extensions)
         self.assertIn('.atr', file_extensions)
+
+    def test_parallel(self):
+        """Parallel evaluation should report the same entries in the same
+        order as serial evaluation. Models trained in the serial evaluation
+        are cached, so that both detect the same trigger points.
+        """
+        self.evaluator.model_cache_dir = join(self.conf["output_dir"], 'models')
+        capture = StringIO()
+        sys.stdout = capture
+        serial_reports = self.evaluator.kfold(k=2)
+        self.evaluator.processes = 2
+        parallel_reports = self.evaluator.kfold(k=2)
+        sys.stdout = sys.__stdout__
+
+        self.assertEqual(len(parallel_reports), len(serial_reports))
+        for parallel, serial in zip(parallel_reports, serial_reports):
+            self.assertListEqual(list(parallel.keys()), list(serial.keys()))
+            for key in [
+                    'ID', 'Detector', 'Train Records', 'Test Record', 'TP',
+                    'FP', 'FN']:
+                self.assertEqual(parallel[key], serial[key])
+
+    def test_lazy_records(self):
+        """Lazily loaded records should hold no signal after evaluation."""
+        conf = dict(self.conf, lazy_records=True, channels=[0])
+        evaluator = evaluator_from_dict(conf)
+        capture = StringIO()
+        sys.stdout = capture
+        reports = evaluator.kfold(k=2)
+        sys.stdout = sys.__stdout__
+
+        self.assertEqual(
+            len(reports), len(evaluator.detectors) * (len(conf["records"]) + 2))
+        for record in evaluator.records:
+            self.assertFalse(record.loaded)
@@ -0,0 +1,136 @@
+from os import listdir
+from os.path import dirname
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+import wfdb
+
+from qrsc.utils import featureutils as fu
+from qrsc.utils.signalutils import window_averages
+
+THIS_DIR = dirname(__file__)
+RECORD_DIR = '/'.join([THIS_DIR, 'records'])
+RECORD_NAMES = ['100', '101', '102']
+
+DIFF = (('ediff1d',),)
+AUX = (('window_average', 5), ('ediff1d',))
+
+
+class TestFeatureUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            wfdb.rdrecord('/'.join([RECORD_DIR, name]))
+            for name in RECORD_NAMES]
+        self.spill_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.spill_dir)
+
+    def test_apply_chain(self):
+        signal = self.records[0].p_signal.T[0]
+        npt.assert_array_equal(fu.apply_chain(signal, ()), signal)
+        npt.assert_array_equal(
+            fu.apply_chain(signal, AUX),
+            np.ediff1d(window_averages(signal, [5])[0]))
+
+    def test_fingerprint(self):
+        fingerprints = [
+            fu.record_fingerprint(record) for record in self.records]
+        self.assertEqual(len(set(fingerprints)), len(self.records))
+        self.assertEqual(
+            fu.record_fingerprint(self.records[0]),
+            fu.record_fingerprint(
+                wfdb.rdrecord('/'.join([RECORD_DIR, RECORD_NAMES[0]]))))
+
+    def test_fingerprint_all_samples(self):
+        """Records differing in a single sample should not share features,
+        also in signals much longer than the test records.
+        """
+        signal = np.random.RandomState(0).normal(size=(10000, 1))
+        record = wfdb.Record(p_signal=signal, record_name='long')
+        changed_signal = signal.copy()
+        changed_signal[4097, 0] += 1.
+        changed = wfdb.Record(p_signal=changed_signal, record_name='long')
+        self.assertNotEqual(
+            fu.record_fingerprint(record), fu.record_fingerprint(changed))
+        store = fu.FeatureStore()
+        store.get(record, DIFF)
+        npt.assert_array_equal(
+            store.get(changed, DIFF), np.ediff1d(changed_signal.T[0]))
+        self.assertEqual(store.misses, 2)
+
+    def test_get(self):
+        store = fu.FeatureStore()
+        for _ in range(2):
+            for record in self.records:
+                signal = record.p_signal.T[0]
+                npt.assert_array_equal(
+                    store.get(record, DIFF), np.ediff1d(signal))
+                npt.assert_array_equal(
+                    store.get(record, AUX),
+                    np.ediff1d(window_averages(signal, [5])[0]))
+        self.assertEqual(store.misses, 6)
+        self.assertEqual(store.hits, 6)
+        self.assertEqual(len(store), 6)
+        self.assertFalse(store.get(self.records[0], DIFF).flags.writeable)
+
+    def test_get_many(self):
+        """Features should not depend on which features are requested
+        together.
+        """
+        chains = [
+            (('window_average', size), ('ediff1d',)) for size in [1, 3, 5]]
+        together = fu.FeatureStore().get_many(self.records[0], chains)
+        store = fu.FeatureStore()
+        for chain, feature in zip(chains, together):
+            self.assertEqual(feature.dtype, np.float32)
+            npt.assert_array_equal(store.get(self.records[0], chain), feature)
+        store.get_many(self.records[0], chains + [DIFF])
+        self.assertEqual(store.hits, 3)
+        self.assertEqual(store.misses, 4)
+
+    def test_raw(self):
+        """The raw signal should be returned as read-only view, but not be
+        stored.
+        """
+        store = fu.FeatureStore()
+        raw, diff = store.get_many(self.records[0], [(), DIFF])
+        npt.assert_array_equal(raw, self.records[0].p_signal.T[0])
+        self.assertFalse(raw.flags.writeable)
+        self.assertTrue(self.records[0].p_signal.flags.writeable)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.size, diff.nbytes)
+        self.assertEqual(store.misses, 1)
+
+    def test_budget(self):
+        """Least recently used features should be dropped first."""
+        nbytes = np.ediff1d(self.records[0].p_signal.T[0]).nbytes
+        store = fu.FeatureStore(budget=2 * nbytes)
+        for record in self.records:
+            store.get(record, DIFF)
+        self.assertEqual(len(store), 2)
+        self.assertLessEqual(store.size, store.budget)
+        store.get(self.records[2], DIFF)
+        self.assertEqual(store.hits, 1)
+        store.get(self.records[0], DIFF)
+        self.assertEqual(store.misses, 4)
+
+    def test_spill(self):
+        nbytes = np.ediff1d(self.records[0].p_signal.T[0]).nbytes
+        store = fu.FeatureStore(budget=nbytes, spill_dir=self.spill_dir)
+        for record in self.records:
+            store.get(record, DIFF)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(len(listdir(self.spill_dir)), 2)
+        spilled = store.get(self.records[0], DIFF)
+        self.assertIsInstance(spilled, np.memmap)
+        npt.assert_array_equal(
+            spilled, np.ediff1d(self.records[0].p_signal.T[0]))
+        self.assertEqual(store.misses, 3)
+        store.clear()
+        self.assertEqual(len(store), 0)
+        self.assertListEqual(listdir(self.spill_dir), [])
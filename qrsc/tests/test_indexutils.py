@@ -1,5 +1,7 @@
 import unittest
 
+import numpy.testing as npt
+
 import qrsc.utils.indexutils as iu
 
 
@@ -15,6 +17,13 @@ class TestIndexUtils(unittest.TestCase):
                 old_window_size=4, new_window_size=2),
             [(1, 1), (5, 1), (7, 0)])
 
+    def test_rescale_indexes(self):
+        npt.assert_array_equal(
+            iu.rescale_indexes(
+                window_indexes=[3, 2, 1],
+                old_window_size=4, new_window_size=2),
+            [1, 1, 0])
+
     def test_index_pair(self):
         self.assertTupleEqual(iu.index_pair(0, 4, [10, 12, 11]), (0, 0))
         self.assertTupleEqual(iu.index_pair(1, 4, [10, 12, 11]), (0, 1))
@@ -28,6 +37,23 @@ class TestIndexUtils(unittest.TestCase):
         with self.assertRaises(IndexError):
             iu.index_pair(24, 4, [10, 12, 11])
 
+    def test_chunk_offsets(self):
+        npt.assert_array_equal(
+            iu.chunk_offsets(window_size=4, chunk_sizes=[10, 12, 11]),
+            [0, 7, 16, 24])
+
+    def test_index_arrays(self):
+        """Index arrays should contain the same pairs as index_pair."""
+        offsets = iu.chunk_offsets(window_size=4, chunk_sizes=[10, 12, 11])
+        chunk_indexes, window_indexes = iu.index_arrays(
+            [0, 1, 6, 7, 15, 16, 23], offsets)
+        npt.assert_array_equal(chunk_indexes, [0, 0, 0, 1, 1, 2, 2])
+        npt.assert_array_equal(window_indexes, [0, 1, 6, 0, 8, 0, 7])
+        with self.assertRaises(IndexError):
+            iu.index_arrays([-1], offsets)
+        with self.assertRaises(IndexError):
+            iu.index_arrays([3, 24], offsets)
+
     def test_indexes_for_batch(self):
         self.assertListEqual(
             list(iu.indexes_for_batch(batch_index=1, batch_size=4)),
@@ -54,3 +80,17 @@ class TestIndexUtils(unittest.TestCase):
                 window_size=2,
                 chunk_sizes=[10, 12, 11]),
             [(0, 8), (1, 0), (1, 1), (1, 2)])
+
+    def test_index_arrays_for_batch(self):
+        offsets = iu.chunk_offsets(window_size=2, chunk_sizes=[10, 12, 11])
+        chunk_indexes, window_indexes = iu.index_arrays_for_batch(
+            batch_index=2, batch_size=4, offsets=offsets)
+        npt.assert_array_equal(chunk_indexes, [0, 1, 1, 1])
+        npt.assert_array_equal(window_indexes, [8, 0, 1, 2])
+        chunk_indexes, window_indexes = iu.index_arrays_for_batch(
+            batch_index=7, batch_size=4, offsets=offsets, partial=True)
+        npt.assert_array_equal(chunk_indexes, [2, 2])
+        npt.assert_array_equal(window_indexes, [8, 9])
+        with self.assertRaises(IndexError):
+            iu.index_arrays_for_batch(
+                batch_index=7, batch_size=4, offsets=offsets)
@@ -1,5 +1,8 @@
 import unittest
 
+import numpy as np
+import numpy.testing as npt
+
 from qrsc.generators import LabelGenerator
 
 SIGNAL_CHUNKS = [
@@ -61,6 +64,32 @@ class TestLabelGenerator(unittest.TestCase):
         with self.assertRaises(IndexError):
             self.labels.labels([(1, 8), (2, 0), (3, 0)])
 
+    def test_gather(self):
+        labels = self.labels.gather([0, 0, 0, 1], [0, 1, 6, 0])
+        self.assertEqual(labels.dtype, np.uint8)
+        npt.assert_array_equal(labels, [1, 1, 0, 1])
+        npt.assert_array_equal(
+            self.labels.batch(11, as_array=True), self.labels[11])
+        with self.assertRaises(IndexError):
+            self.labels.gather([0, 3], [0, 0])
+        with self.assertRaises(IndexError):
+            self.labels.gather([0], [7])
+
+    def test_sparse(self):
+        """Sparse labels should equal labels read from the trigger signal."""
+        for detection_size in [0, 1, 3]:
+            labels = LabelGenerator(
+                TRIGGER_CHUNKS, [len(chunk) for chunk in SIGNAL_CHUNKS],
+                batch_size=2, window_size=4, detection_size=detection_size)
+            sparse_labels = LabelGenerator(
+                TRIGGER_CHUNKS, [len(chunk) for chunk in SIGNAL_CHUNKS],
+                batch_size=2, window_size=4, detection_size=detection_size,
+                sparse=True)
+            self.assertIsNone(sparse_labels.trigger_signal)
+            for index in range(len(labels)):
+                self.assertListEqual(sparse_labels[index], labels[index])
+            self.assertEqual(sparse_labels.label(2, 7), labels.label(2, 7))
+
     def test_getitem(self):
         self.assertListEqual(self.labels[0], [1, 1])
         self.assertListEqual(self.labels[1], [0, 0])
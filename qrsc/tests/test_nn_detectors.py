@@ -5,12 +5,16 @@ import sys
 import unittest
 
 from io import StringIO
+import numpy.testing as npt
 from keras.models import Sequential, Model
 import wfdb
 
 from qrsc.detectors import (
-    GarciaBerdonesDetector, RaccoonDetector, SarlijaDetector, XiangDetector)
+    GarciaBerdonesDetector, RaccoonDetector, RXDetector, SarlijaDetector,
+    XiangDetector, XiangEnsemble)
 from qrsc.utils.annotationutils import trigger_points
+from qrsc.utils.featureutils import FEATURE_VERSION
+from qrsc.utils.triggerutils import signal_to_points
 
 THIS_DIR = dirname(__file__)
 GENERATED_DIR = '/'.join([THIS_DIR, 'generated'])
@@ -113,6 +117,8 @@ class TestNNDetectors(unittest.TestCase):
             self.assertTrue(0 <= min(signal) <= 1)
 
             self.assertTrue(all(map(lambda t: t in range(0, 1000), trigger)))
+            # evaluations derive trigger points with the baseline defaults
+            self.assertListEqual(trigger, signal_to_points(signal))
 
             trigger = detector.trigger(self.records[0])
             self.assertTrue(all(map(lambda t: t in range(0, 1000), trigger)))
@@ -154,4 +160,161 @@ class TestNNDetectors(unittest.TestCase):
 
         xiang_path = '/'.join([GENERATED_DIR, 'xiang.h5'])
         self.xiang.save_model(xiang_path)
-        self.assertTrue(exists(xiang_path))
\ No newline at end of file
+        self.assertTrue(exists(xiang_path))
+
+    def test_load_model(self):
+        path = '/'.join([GENERATED_DIR, 'xiang.h5'])
+        self.xiang.save_model(path)
+        loaded = XiangDetector(
+            name="MyLoadedXiang", batch_size=32, window_size=40,
+            detection_size=10, aux_ratio=5)
+        loaded.load_model(path)
+        for weights, loaded_weights in zip(
+                self.xiang.model.get_weights(), loaded.model.get_weights()):
+            npt.assert_array_equal(weights, loaded_weights)
+
+    def test_model_params(self):
+        params = self.xiang.model_params()
+        self.assertEqual(params['window_size'], 40)
+        self.assertEqual(params['epochs'], 1)
+        self.assertEqual(params['feature_version'], FEATURE_VERSION)
+        for name in ['name', 'threshold', 'tolerance', 'workers']:
+            self.assertNotIn(name, params)
+
+    def test_fully_convolutional(self):
+        """Fully convolutional inference should produce the same trigger
+        signal as windowed inference.
+        """
+        capture = StringIO()
+        sys.stdout = capture
+
+        rx = RXDetector(
+            name="MyRX", batch_size=32, window_size=40, detection_size=10,
+            aux_ratio=5, input_dropout=0.1, conv_dropout=0.1)
+        for detector in [self.raccoon, rx, self.sarlija, self.xiang]:
+            detector.train(self.records, self.triggers)
+            detector.fully_convolutional = False
+            windowed = detector.trigger_signal(self.records[0])
+            detector.fully_convolutional = True
+            convolutional = detector.trigger_signal(self.records[0])
+
+            self.assertEqual(len(convolutional), len(windowed))
+            npt.assert_allclose(convolutional, windowed, atol=1e-5)
+
+        sys.stdout = sys.__stdout__
+
+    def test_fully_convolutional_reuse(self):
+        """The fully convolutional model should be built once per trained
+        model and rebuilt after training, resetting or loading weights.
+        """
+        capture = StringIO()
+        sys.stdout = capture
+
+        self.xiang.fully_convolutional = True
+        self.xiang.train(self.records, self.triggers)
+        self.xiang.trigger_signal(self.records[0])
+        model = self.xiang._convolutional_model
+        self.assertIsNotNone(model)
+        self.xiang.trigger_signal(self.records[1])
+        self.assertIs(self.xiang._convolutional_model, model)
+
+        path = '/'.join([GENERATED_DIR, 'xiang.h5'])
+        self.xiang.save_model(path)
+        self.xiang.load_model(path)
+        self.assertIsNone(self.xiang._convolutional_model)
+
+        self.xiang.trigger_signal(self.records[0])
+        self.xiang.reset()
+        self.assertIsNone(self.xiang._convolutional_model)
+
+        self.xiang.trigger_signal(self.records[0])
+        self.xiang.train(self.records, self.triggers)
+        self.assertIsNone(self.xiang._convolutional_model)
+
+        sys.stdout = sys.__stdout__
+
+    def test_numpy_inference(self):
+        """NumPy inference should produce the same trigger signal as Keras."""
+        capture = StringIO()
+        sys.stdout = capture
+
+        self.garcia.train(self.records, self.triggers)
+        keras_signal = self.garcia.trigger_signal(self.records[0])
+        self.garcia.numpy_inference = True
+        numpy_signal = self.garcia.trigger_signal(self.records[0])
+
+        self.assertEqual(len(numpy_signal), len(keras_signal))
+        npt.assert_allclose(numpy_signal, keras_signal, atol=1e-5)
+
+        sys.stdout = sys.__stdout__
+
+    def test_input_signals(self):
+        """Every detector should have one input signal per window size,
+        detectors on the raw ECG signal take the first channel unchanged.
+        """
+        for detector in [self.garcia, self.raccoon, self.sarlija, self.xiang]:
+            self.assertEqual(
+                len(detector._input_signals(self.records[0])),
+                len(detector._window_sizes()))
+        for detector in [self.garcia, self.sarlija]:
+            npt.assert_array_equal(
+                detector._input_signals(self.records[0])[0],
+                self.records[0].p_signal.T[0])
+
+    def test_trigger_signals(self):
+        """Trigger signals predicted for several records at once should equal
+        the trigger signals predicted record by record.
+        """
+        capture = StringIO()
+        sys.stdout = capture
+
+        for detector in [self.garcia, self.raccoon, self.sarlija, self.xiang]:
+            signals = detector.trigger_signals(self.records)
+            self.assertEqual(len(signals), len(self.records))
+            for record, signal in zip(self.records, signals):
+                npt.assert_allclose(
+                    signal, detector.trigger_signal(record), atol=1e-6)
+
+        sys.stdout = sys.__stdout__
+
+    def test_ensemble_train(self):
+        """Every ensemble member gets its own model, no matter whether members
+        are trained one after another or in parallel.
+        """
+        capture = StringIO()
+        sys.stdout = capture
+
+        for train_processes in [1, 2]:
+            ensemble = XiangEnsemble(
+                name="MyEnsemble", batch_size=32, window_size=40,
+                detection_size=10, aux_ratio=5,
+                train_processes=train_processes)
+            ensemble.train(self.records[:2], self.triggers[:2])
+            members = ensemble.model.detectors
+            self.assertEqual(
+                [member.name for member in members], RECORD_NAMES[:2])
+            self.assertIsNot(members[0].model, members[1].model)
+            signal = ensemble.trigger_signal(self.records[2])
+            self.assertTrue(0 <= min(signal) <= max(signal) <= 1)
+
+        sys.stdout = sys.__stdout__
+
+    def test_fused_inference(self):
+        """Fused ensemble inference should equal the mean of the members'
+        trigger signals.
+        """
+        capture = StringIO()
+        sys.stdout = capture
+
+        ensemble = XiangEnsemble(
+            name="MyEnsemble", batch_size=32, window_size=40,
+            detection_size=10, aux_ratio=5)
+        ensemble.train(self.records[:2], self.triggers[:2])
+        expected = ensemble.trigger_signal(self.records[2])
+        ensemble.fused_inference = True
+        npt.assert_allclose(
+            ensemble.trigger_signal(self.records[2]), expected, atol=1e-6)
+        npt.assert_allclose(
+            ensemble.trigger_signals(self.records[2:])[0], expected, atol=1e-6)
+
+        sys.stdout = sys.__stdout__
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+import numpy.testing as npt
+
+import qrsc.utils.nnutils as nu
+
+
+class TestNNUtils(unittest.TestCase):
+
+    def test_activations(self):
+        x = np.array([-2., 0., 3.])
+        npt.assert_array_equal(nu.ACTIVATIONS['linear'](x), x)
+        npt.assert_array_equal(nu.ACTIVATIONS['relu'](x), [0., 0., 3.])
+        npt.assert_allclose(
+            nu.ACTIVATIONS['sigmoid'](x), 1 / (1 + np.exp(-x)))
+
+    def test_dense(self):
+        inputs = np.array([[1., 2.], [-1., 0.]])
+        kernel = np.array([[1., -1., 0.], [0., 1., 2.]])
+        bias = np.array([0., 0., -1.])
+        npt.assert_array_equal(
+            nu.dense(inputs, kernel, bias),
+            [[1., 1., 3.], [-1., 1., -1.]])
+        npt.assert_array_equal(
+            nu.dense(inputs, kernel, bias, activation='relu'),
+            [[1., 1., 3.], [0., 1., 0.]])
+
+    def test_dense_stack(self):
+        inputs = np.array([[1., 2.], [-1., 0.]])
+        weights = [
+            (np.array([[1.], [1.]]), np.array([-1.]), 'relu'),
+            (np.array([[2.]]), np.array([1.]), 'linear')]
+        npt.assert_array_equal(nu.dense_stack(inputs, weights), [[5.], [1.]])
+
+    def test_dense_stack_blocked(self):
+        inputs = np.random.rand(100, 4)
+        weights = [
+            (np.random.rand(4, 3), np.random.rand(3), 'relu'),
+            (np.random.rand(3, 1), np.random.rand(1), 'sigmoid')]
+        npt.assert_allclose(
+            nu.dense_stack_blocked(inputs, weights, block_size=7),
+            nu.dense_stack(inputs, weights))
+        self.assertEqual(
+            nu.dense_stack_blocked(inputs[:0], weights, block_size=7).shape,
+            (0, 1))
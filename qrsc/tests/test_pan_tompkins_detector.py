@@ -47,6 +47,19 @@ class TestPanTompkinsDetectors(unittest.TestCase):
         self.assertTrue(0 <= max(trigger) <= 1000)
         self.assertTrue(0 <= min(trigger) <= 1000)
 
+    def test_detection_params(self):
+        """Detection parameters should be all constructor parameters except
+        name, unstored parameters should not be dropped silently.
+        """
+        self.assertEqual(dict(self.ptd.detection_params()), {'window_size': 10})
+
+        class ScaledDetector(PanTompkinsDetector):
+            def __init__(self, name, window_size, scale):
+                super().__init__(name, window_size)
+
+        with self.assertRaises(AttributeError):
+            ScaledDetector("MyPTD", 10, 2).detection_params()
+
     def test_superfluous_functions_exist(self):
         self.ptd.train(None, None)
         self.ptd.reset()
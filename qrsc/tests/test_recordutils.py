@@ -0,0 +1,109 @@
+from os import listdir
+from os.path import dirname
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import numpy.testing as npt
+
+from qrsc.utils import recordutils as ru
+
+THIS_DIR = dirname(__file__)
+RECORD_DIR = '/'.join([THIS_DIR, 'records'])
+RECORD_NAMES = ['100', '101']
+
+
+class TestRecordUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.cache_dir)
+
+    def test_read_record(self):
+        """Cached records should equal records read from the wfdb files."""
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        record, trigger, labels = ru.read_record(path, sampfrom=10)
+        for _ in range(2):
+            cached_record, cached_trigger, cached_labels = ru.read_record(
+                path, sampfrom=10, cache_dir=self.cache_dir)
+            self.assertIsInstance(cached_record.p_signal, np.memmap)
+            npt.assert_array_equal(
+                cached_record.p_signal.T[0], record.p_signal.T[0])
+            self.assertEqual(cached_record.record_name, record.record_name)
+            self.assertListEqual(cached_trigger, list(trigger))
+            self.assertListEqual(cached_labels, list(labels))
+        self.assertEqual(len(listdir(self.cache_dir)), 1)
+
+    def test_read_records(self):
+        records, triggers, labels = ru.read_records(
+            RECORD_DIR, RECORD_NAMES, sampto=500, cache_dir=self.cache_dir)
+        self.assertListEqual(
+            [record.record_name for record in records], RECORD_NAMES)
+        self.assertEqual(len(records[0].p_signal), 500)
+        self.assertEqual(len(triggers), len(labels))
+        self.assertEqual(len(listdir(self.cache_dir)), 2)
+
+    def test_channels(self):
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        record, _, _ = ru.read_record(path, sampto=500)
+        for cache_dir in [None, self.cache_dir]:
+            selected, _, _ = ru.read_record(
+                path, sampto=500, channels=[1], dtype=np.float32,
+                cache_dir=cache_dir)
+            self.assertEqual(selected.p_signal.shape, (500, 1))
+            self.assertEqual(selected.p_signal.dtype, np.float32)
+            npt.assert_array_equal(
+                selected.p_signal.T[0], record.p_signal.T[1].astype(np.float32))
+
+    def test_all_channels(self):
+        """Unspecified channels should mean all channels, whether the record
+        is cached or not.
+        """
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        record, _, _ = ru.read_record(path, sampto=500)
+        self.assertEqual(record.p_signal.shape, (500, 2))
+        cached, _, _ = ru.read_record(
+            path, sampto=500, cache_dir=self.cache_dir)
+        npt.assert_array_equal(cached.p_signal, record.p_signal)
+        for cache_dir in [None, self.cache_dir]:
+            lazy = ru.LazyRecord(path, sampto=500, cache_dir=cache_dir)
+            self.assertEqual(lazy.n_sig, 2)
+            npt.assert_array_equal(lazy.p_signal, record.p_signal)
+        self.assertEqual(len(listdir(self.cache_dir)), 1)
+
+    def test_lazy_record(self):
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        record, _, _ = ru.read_record(path, sampto=500)
+        for cache_dir in [None, self.cache_dir]:
+            lazy = ru.LazyRecord(
+                path, sampto=500, channels=[0], cache_dir=cache_dir)
+            self.assertEqual(lazy.record_name, record.record_name)
+            self.assertEqual(lazy.fs, record.fs)
+            self.assertEqual(lazy.sig_len, 500)
+            self.assertFalse(lazy.loaded)
+            npt.assert_array_equal(lazy.p_signal.T[0], record.p_signal.T[0])
+            self.assertTrue(lazy.loaded)
+            lazy.evict()
+            self.assertFalse(lazy.loaded)
+
+    def test_read_trigger(self):
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        _, trigger, labels = ru.read_record(path, sampfrom=10, sampto=900)
+        self.assertEqual(
+            ru.read_trigger(path, sampfrom=10, sampto=900), (trigger, labels))
+
+    def test_read_trigger_cached(self):
+        """Trigger points of cached records should be read from the cache
+        without parsing the annotation file.
+        """
+        path = '/'.join([RECORD_DIR, RECORD_NAMES[0]])
+        _, trigger, labels = ru.read_record(
+            path, sampto=900, cache_dir=self.cache_dir)
+        with patch('wfdb.rdann', side_effect=AssertionError):
+            self.assertEqual(
+                ru.read_trigger(path, sampto=900, cache_dir=self.cache_dir),
+                (trigger, labels))
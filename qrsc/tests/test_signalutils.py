@@ -19,4 +19,51 @@ class TestSignalUtils(unittest.TestCase):
             np.array([1.5, 3.5]))
         npt.assert_array_equal(
             su.window_average(np.array([1, 2, 3, 4, 5]), window_size=1),
-            np.array([1, 2, 3, 4, 5]))
\ No newline at end of file
+            np.array([1, 2, 3, 4, 5]))
+
+    def test_window_averages(self):
+        """All window sizes should be averaged like window_average does,
+        independently of chunk size and other window sizes.
+        """
+        signal = np.random.RandomState(0).normal(size=1003)
+        window_sizes = [1, 3, 4, 10, 2000]
+        averages = su.window_averages(signal, window_sizes, chunk_size=64)
+        for window_size, average in zip(window_sizes, averages):
+            self.assertEqual(average.dtype, np.float32)
+            self.assertTrue(average.flags.c_contiguous)
+            npt.assert_allclose(
+                average, su.window_average(signal, window_size), rtol=1e-6)
+            npt.assert_array_equal(
+                average, su.window_averages(signal, [window_size])[0])
+        for chunk_size in [1, 7, 1003, 5000]:
+            for average, chunked in zip(
+                    averages,
+                    su.window_averages(signal, window_sizes, chunk_size)):
+                npt.assert_array_equal(average, chunked)
+
+    def test_window_averager(self):
+        """Streamed chunks of uneven size should add up to the averages of
+        the whole signal.
+        """
+        signal = np.arange(20, dtype=np.float64)
+        averager = su.WindowAverager([3, 5])
+        parts = [averager.update(signal[a:b]) for a, b in [
+            (0, 2), (2, 2), (2, 9), (9, 20)]]
+        npt.assert_array_equal(
+            np.concatenate([part[0] for part in parts]),
+            su.window_average(signal, 3))
+        npt.assert_array_equal(
+            np.concatenate([part[1] for part in parts]),
+            su.window_average(signal, 5))
+        self.assertEqual(averager.position, 20)
+
+    def test_sliding_windows(self):
+        """Row i of the result is the window starting at sample i. The result
+        is a read-only view sharing memory with the signal.
+        """
+        signal = np.array([1, 2, 3, 4, 5])
+        windows = su.sliding_windows(signal, window_size=3)
+        npt.assert_array_equal(windows, [[1, 2, 3], [2, 3, 4], [3, 4, 5]])
+        self.assertTrue(np.shares_memory(windows, signal))
+        self.assertFalse(windows.flags.writeable)
+        self.assertEqual(su.sliding_windows(signal, window_size=6).shape, (0, 6))
@@ -0,0 +1,109 @@
+from os import listdir
+from shutil import rmtree
+from tempfile import mkdtemp
+import unittest
+
+import numpy as np
+
+from qrsc.utils import storeutils as su
+from qrsc.utils.evaluationutils import trigger_metrics
+from qrsc.utils.triggerutils import points_to_signal, signal_to_points
+
+
+class Detector:
+    name = 'MyDetector'
+
+    def __repr__(self):
+        return 'MyDetector (Detector)'
+
+
+class TestStoreUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = mkdtemp()
+        rng = np.random.RandomState(42)
+        self.true_triggers = [[10, 50, 90, 130], [20, 60, 100]]
+        self.trigger_signals = [
+            np.clip(
+                np.array(points_to_signal([12, 49, 70, 131], 150, 6))
+                + rng.uniform(0, .4, 150), 0, 1),
+            np.clip(
+                np.array(points_to_signal([20, 61, 103], 120, 8))
+                + rng.uniform(0, .4, 120), 0, 1)]
+        for evaluation_id in range(2):
+            su.save_trigger_signals(
+                self.directory, 'eval{}'.format(evaluation_id),
+                evaluation_id, Detector(), ['100', '101'],
+                self.true_triggers, self.trigger_signals, 5, threshold=.5,
+                tolerance=3)
+
+    def tearDown(self):
+        rmtree(self.directory)
+
+    def test_save_trigger_signals(self):
+        self.assertEqual(len(listdir(self.directory)), 6)
+        indexes = su.load_trigger_signals(self.directory)
+        self.assertEqual(len(indexes), 2)
+        self.assertEqual(indexes[0]['threshold'], .5)
+        for record, true_trigger, trigger_signal in zip(
+                indexes[0]['records'], self.true_triggers,
+                self.trigger_signals):
+            self.assertEqual(record['true_trigger'], true_trigger)
+            self.assertEqual(record['trigger_signal'].dtype, np.float16)
+            np.testing.assert_allclose(
+                record['trigger_signal'], trigger_signal, atol=1e-3)
+
+    def test_rethreshold(self):
+        """Metrics should equal those of trigger points derived from the
+        stored trigger signals with signal_to_points.
+        """
+        thresholds, tolerances = [.5, .8, .95], [0, 3]
+        report = su.rethreshold(
+            self.directory, thresholds, tolerances, trigger_distance=2)
+        self.assertEqual(len(report), len(thresholds) * len(tolerances))
+        stored = [
+            np.asarray(record['trigger_signal'], dtype=np.float64)
+            for record in su.load_trigger_signals(self.directory)[0]['records']]
+        for entry in report:
+            self.assertEqual(entry['Records'], 4)
+            tp, fp, fn = 0, 0, 0
+            for true_trigger, signal in zip(self.true_triggers, stored):
+                metrics = trigger_metrics(
+                    true_trigger,
+                    signal_to_points(
+                        signal, threshold=entry['Threshold'],
+                        tolerance=entry['Tolerance']),
+                    2)
+                tp, fp, fn = tp + metrics[0], fp + metrics[2], fn + metrics[3]
+            self.assertEqual(
+                (entry['TP'], entry['FP'], entry['FN']), (2 * tp, 2 * fp, 2 * fn))
+
+    def test_rethreshold_by_evaluation(self):
+        report = su.rethreshold(
+            self.directory, [.5], [3], by_evaluation=True)
+        self.assertListEqual([entry['ID'] for entry in report], [0, 1])
+        self.assertEqual(report[0]['Records'], 2)
+
+    def test_save_unnormalized(self):
+        su.save_trigger_signals(
+            self.directory, 'large', 2, Detector(), ['100'],
+            self.true_triggers[:1], [self.trigger_signals[0] * 1e6], 5)
+        stored = su.load_trigger_signals(self.directory)[-1]['records'][0]
+        self.assertEqual(stored['trigger_signal'].dtype, np.float32)
+
+    def test_skip_empty(self):
+        """Records without trigger signal should not be stored, and nothing
+        at all if no record has one.
+        """
+        self.assertEqual(
+            su.save_trigger_signals(
+                self.directory, 'empty', 2, Detector(), ['100', '101'],
+                self.true_triggers, [[], []], 5), 0)
+        self.assertEqual(
+            su.save_trigger_signals(
+                self.directory, 'partial', 3, Detector(), ['100', '101'],
+                self.true_triggers, [self.trigger_signals[0], []], 5), 1)
+        indexes = su.load_trigger_signals(self.directory)
+        self.assertEqual(len(indexes), 3)
+        self.assertEqual(len(indexes[-1]['records']), 1)
+        self.assertIsNone(indexes[-1]['threshold'])
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from qrsc.utils import triggerutils as tu
 
 class TestTriggerUtils(unittest.TestCase):
@@ -32,6 +34,22 @@ class TestTriggerUtils(unittest.TestCase):
         signal = [0]*10 + [1]*5 + [0]*2 + [1]*7
         self.assertEqual(list(tu.signal_to_spikes(signal)), [(10,15), (17,24)])
 
+    def test_find_spikes(self):
+        """find_spikes should equal the ripple removal pipeline, also where
+        ripple removal depends on earlier gaps being filled.
+        """
+        signals = [
+            [0.,1.,1.,1.,0.,0.,1.,1.,1.,0.,0.,0.,1.,1.,1.,0.],
+            [1.,0.,0.,1.,0.,0.,1.,0.,0.,0.,1.,0.,1.,1.,0.,0.,1.],
+            [0.,0.,1.,0.,1.,0.,0.,1.,1.,0.,0.,0.,0.,1.,0.,0.,1.,0.]]
+        for signal in signals:
+            for tolerance in range(6):
+                begins, ends = tu.find_spikes(signal, tolerance=tolerance)
+                expected = list(tu.signal_to_spikes(
+                    tu.remove_ripple(list(signal), tolerance)))
+                self.assertListEqual(
+                    list(zip(begins.tolist(), ends.tolist())), expected)
+
     def test_spikes_to_points(self):
         spikes = [(25,50), (2,7), (10,20)]
         points = [37, 4, 15]
@@ -46,6 +64,46 @@ class TestTriggerUtils(unittest.TestCase):
         self.assertListEqual(pts, [2, 7])
         self.assertListEqual(certs, [.9, .6])
 
+    def test_sweep(self):
+        """Every combination should equal signal_to_points with the same
+        parameters.
+        """
+        signal = [.0, .7, 1., 1., .2, .0, .7, .5, .3, .9, .6, .1, .8]
+        thresholds = [.5, .8, .3]
+        tolerances = [0, 1, 2]
+        min_widths = [0, 2]
+        results = tu.sweep(signal, thresholds, tolerances, min_widths)
+        self.assertEqual(len(results), 18)
+        self.assertListEqual(
+            [result['threshold'] for result in results[::6]], [.8, .5, .3])
+        for result in results:
+            pts, certs = tu.signal_to_points(
+                signal, result['threshold'], result['tolerance'],
+                with_certainty=True, min_width=result['min_width'])
+            self.assertListEqual(result['points'], pts)
+            self.assertListEqual(result['certainties'], certs)
+
+    def test_sweep_incremental(self):
+        """Runs updated threshold by threshold should give the spikes of
+        find_spikes, also for repeated sample values.
+        """
+        rng = np.random.RandomState(0)
+        thresholds = [1., .9, .7, .5, .3, .1, 0.]
+        for signal in [rng.rand(200), np.round(rng.rand(200), 1)]:
+            for result in tu.sweep(signal, thresholds, [0, 2, 5]):
+                begins, ends = tu.find_spikes(
+                    signal, result['threshold'], result['tolerance'])
+                self.assertListEqual(
+                    result['points'], ((begins + ends) // 2).tolist())
+
+    def test_sweep_metrics(self):
+        signal = [.0, .7, 1., 1., .2, .0, .7, .5]
+        results = tu.sweep(
+            signal, [.5], [0], true_trigger=[2, 5], trigger_distance=1)
+        self.assertListEqual(results[0]['points'], [2, 7])
+        self.assertEqual(
+            [results[0][key] for key in ['TP', 'FP', 'FN']], [1, 1, 1])
+
     def test_points_to_signal(self):
         points = [2, 7, 13]
         signal_length = 20
@@ -63,10 +121,30 @@ class TestTriggerUtils(unittest.TestCase):
                 tu.points_to_signal(points, signal_length, window_size),
                 signals[window_size])
 
+    def test_spike_values(self):
+        points = [13, 2, 7]
+        for window_size in range(7):
+            begins, ends = tu.points_to_spikes(points, 20, window_size)
+            self.assertListEqual(
+                tu.spike_values(begins, ends, range(20)).tolist(),
+                [bool(value) for value in
+                 tu.points_to_signal(points, 20, window_size)])
+
     def test_spikes_to_certainties(self):
         signal = [.0, .5, 1., 1., .2, .0, .7, .5]
         spikes = [(0,2), (1,5), (6,8)]
         certainties = [.25, .675, .6]
         self.assertListEqual(
             tu.spikes_to_certainties(spikes, signal),
-            certainties)
\ No newline at end of file
+            certainties)
+
+    def test_spikes_to_certainties_widths(self):
+        signal = [.0, .5, 1., 1., .2, .0, .7, .5]
+        spikes = [(0,2), (1,5), (6,8)]
+        self.assertListEqual(
+            tu.spikes_to_certainties(spikes, signal, spike_width=4),
+            [.125, .675, .3])
+        self.assertListEqual(
+            tu.spikes_to_certainties(spikes, signal, spike_width=[2, 4]),
+            [[.25, 1.35, .6], [.125, .675, .3]])
+        self.assertListEqual(tu.spikes_to_certainties([], signal), [])
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy.testing as npt
+
 from qrsc.generators import WindowGenerator
 
 SIGNAL_CHUNKS = [
@@ -88,3 +90,32 @@ class TestWindowGenerator(unittest.TestCase):
             [[0.5, 0.7, 0.9, 0.1], [0.7, 0.9, 0.1, 0.3]])
         with self.assertRaises(IndexError):
             self.swg.batch(12)
+
+    def test_gather(self):
+        """Windows from strided views should equal the windows returned by
+        window(), including the off-by-one correction.
+        """
+        npt.assert_array_equal(
+            self.swg.gather([0, 0, 1, 2], [6, 0, 8, 8]),
+            [self.swg.window(0, 6), self.swg.window(0, 0),
+             self.swg.window(1, 8), self.swg.window(2, 7)])
+        npt.assert_array_equal(
+            self.swg_wrap.gather([1, 1], [2, 3]),
+            [[[0.2], [0.5], [0.8], [0.4]], [[0.5], [0.8], [0.4], [0.2]]])
+        with self.assertRaises(IndexError):
+            self.swg.gather([0, 3], [0, 0])
+        with self.assertRaises(IndexError):
+            self.swg.gather([1], [-1])
+
+    def test_partial_batch(self):
+        """With partial_batch, the remaining windows form a last, smaller
+        batch.
+        """
+        swg = WindowGenerator(
+            SIGNAL_CHUNKS, batch_size=5, window_size=4, partial_batch=True)
+        self.assertEqual(len(swg), 5)
+        self.assertListEqual(
+            swg.index_pairs_for_batch(4), [(2, 4), (2, 5), (2, 6), (2, 7)])
+        self.assertEqual(swg[4].shape, (4, 4))
+        with self.assertRaises(IndexError):
+            swg.index_pairs_for_batch(5)
@@ -0,0 +1,147 @@
+from hashlib import sha1
+from os import close, makedirs, remove, replace
+from os.path import dirname, exists, expanduser, join
+from tempfile import mkstemp
+
+import numpy as np
+
+# version of the cached models and detections, to be increased whenever the
+# code computing them or their file format changes, so that stale entries are
+# not reused
+CACHE_VERSION = 1
+
+DEFAULT_MODEL_CACHE_DIR = join(expanduser('~'), '.cache', 'qrsc', 'models')
+DEFAULT_DETECTION_CACHE_DIR = join(
+    expanduser('~'), '.cache', 'qrsc', 'detections')
+
+
+def array_digest(array):
+    """Hash of an array's data type, shape and content."""
+    array = np.ascontiguousarray(array)
+    digest = sha1(repr((array.dtype.str, array.shape)).encode())
+    digest.update(array.data)
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """Hash of the representations of parts, e.g. parameters and digests."""
+    return sha1(repr(parts).encode()).hexdigest()
+
+
+def records_digest(records, triggers):
+    """Hash identifying records by name, first channel and trigger points."""
+    return cache_key(*[
+        (record.record_name,
+         array_digest(record.p_signal.T[0]),
+         array_digest(np.asarray(trigger, dtype=np.int64)))
+        for record, trigger in zip(records, triggers)])
+
+
+def _replace_atomically(write, path, suffix):
+    """Write a file with write(tmp_path) under a temporary name and move it
+    to path, so that concurrent evaluations never read partial files.
+    """
+    fd, tmp_path = mkstemp(suffix=suffix, dir=dirname(path))
+    close(fd)
+    try:
+        write(tmp_path)
+        replace(tmp_path, path)
+    except BaseException:
+        if exists(tmp_path): remove(tmp_path)
+        raise
+
+
+class ModelCache:
+    """Content-addressed cache of trained detector models.
+
+    Models are keyed by CACHE_VERSION, the detector class, the constructor
+    parameters that influence training (see NNDetector.model_params) and the
+    training records and trigger points. Detectors supporting the cache have a true
+    model_cacheable attribute and save_model/load_model methods.
+
+    Args:
+        cache_dir (str, optional): Directory the model files are stored in.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_MODEL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def supports(self, detector):
+        return getattr(detector, 'model_cacheable', False)
+
+    def key(self, detector, records, triggers):
+        return cache_key(
+            CACHE_VERSION,
+            type(detector).__module__,
+            type(detector).__qualname__,
+            sorted(detector.model_params().items()),
+            records_digest(records, triggers))
+
+    def path(self, key):
+        return join(self.cache_dir, key + '.h5')
+
+    def load(self, detector, key):
+        """Load the model cached under key into detector. Returns False if
+        there is none.
+        """
+        if not exists(self.path(key)):
+            return False
+        detector.load_model(self.path(key))
+        return True
+
+    def save(self, detector, key):
+        """Cache the model of detector under key."""
+        makedirs(self.cache_dir, exist_ok=True)
+        _replace_atomically(detector.save_model, self.path(key), '.h5')
+
+
+class DetectionCache:
+    """Content-addressed cache of the detections of deterministic detectors
+    that need no training.
+
+    Detections are keyed by CACHE_VERSION, the detector class, its parameters
+    (see NonNNDetector.detection_params) and the record's sampling frequency
+    and first channel. Trigger points and trigger signals are stored together with
+    the runtime measured when they were computed.
+
+    Args:
+        cache_dir (str, optional): Directory the detections are stored in.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_DETECTION_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def supports(self, detector):
+        return getattr(detector, 'detection_cacheable', False)
+
+    def key(self, detector, record):
+        return cache_key(
+            CACHE_VERSION,
+            type(detector).__module__,
+            type(detector).__qualname__,
+            sorted(detector.detection_params().items()),
+            record.fs,
+            array_digest(record.p_signal.T[0]))
+
+    def path(self, key):
+        return join(self.cache_dir, key + '.npz')
+
+    def load(self, key):
+        """Trigger points, trigger signal and measured runtime cached under
+        key, None if there are none.
+        """
+        if not exists(self.path(key)):
+            return None
+        with np.load(self.path(key)) as data:
+            return data['trigger'], data['trigger_signal'], float(
+                data['runtime'])
+
+    def save(self, key, trigger, trigger_signal, runtime):
+        makedirs(self.cache_dir, exist_ok=True)
+        _replace_atomically(
+            lambda path: np.savez(
+                path,
+                trigger=np.asarray(trigger, dtype=np.int64),
+                trigger_signal=np.asarray(trigger_signal, dtype=np.float64),
+                runtime=runtime),
+            self.path(key), '.npz')
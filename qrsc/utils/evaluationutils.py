@@ -1,54 +1,148 @@
 import numpy as np
 
+def _match_counts(points, other_points, tolerance):
+    """Number of other points within tolerance of each point."""
+    other_points = np.sort(np.asarray(other_points).reshape(-1))
+    points = np.asarray(points).reshape(-1)
+    return (
+        np.searchsorted(other_points, points + tolerance, side='right')
+        - np.searchsorted(other_points, points - tolerance, side='left'))
+
 def merge(true_trigger, detected_trigger, tolerance):
-    for true_point in true_trigger:
-        matches = [detected_point
-            for detected_point in detected_trigger
-            if abs(detected_point - true_point) <= tolerance]
-        
-        if len(matches) == 0:
+    detected_points = np.asarray(detected_trigger).reshape(-1)
+    true_points = np.asarray(true_trigger).reshape(-1)
+    # detected points in ascending order, ties in list order
+    order = np.argsort(detected_points, kind='stable')
+    sorted_detected = detected_points[order]
+    lows = np.searchsorted(
+        sorted_detected, true_points - tolerance, side='left')
+    highs = np.searchsorted(
+        sorted_detected, true_points + tolerance, side='right')
+
+    for true_point, low, high in zip(true_trigger, lows, highs):
+        if low == high:
             yield (true_point, np.nan, 'FN')
             continue
-            
-        matches.sort(key=lambda m: abs(true_point - m))
-        yield (true_point, matches[0], 'TP')
-        
-        for match in matches[1:]:
-            yield (true_point, match, 'FP')
-            
-    for detected_point in detected_trigger:
-        matches = [true_point
-            for true_point in true_trigger
-            if abs(true_point - detected_point) <= tolerance]
-        
-        if len(matches) == 0:
+
+        # closest first, ties in list order
+        matches = sorted(
+            (abs(true_point - detected_trigger[idx]), idx)
+            for idx in order[low:high].tolist())
+        yield (true_point, detected_trigger[matches[0][1]], 'TP')
+
+        for _, idx in matches[1:]:
+            yield (true_point, detected_trigger[idx], 'FP')
+
+    unmatched = _match_counts(detected_trigger, true_trigger, tolerance) == 0
+    for detected_point, is_unmatched in zip(detected_trigger, unmatched):
+        if is_unmatched:
             yield (np.nan, detected_point, 'FP')
 
 def trigger_metrics(true_trigger, detected_trigger, tolerance):
-    tp, tn, fp, fn = 0, 0, 0, 0
+    matches = _match_counts(true_trigger, detected_trigger, tolerance)
+    tp = int(np.count_nonzero(matches))
+    fn = len(matches) - tp
+    fp = int(np.sum(matches[matches > 1] - 1)) + int(np.count_nonzero(
+        _match_counts(detected_trigger, true_trigger, tolerance) == 0))
+    return (tp, 0, fp, fn)
 
-    for true_point in true_trigger:
-        matches = len([detected_point
-            for detected_point in detected_trigger
-            if abs(detected_point - true_point) <= tolerance])
-        if matches == 0: fn += 1
-        if matches > 0: tp += 1
-        if matches > 1: fp += matches-1
+def triggers_metrics(true_triggers, detected_triggers, tolerance):
+    """Sum of the trigger metrics (TP, TN, FP, FN) of several records as an
+    array.
+    """
+    return np.sum([np.zeros(4, dtype=int)] + [
+        trigger_metrics(true_trigger, detected_trigger, tolerance)
+        for true_trigger, detected_trigger
+        in zip(true_triggers, detected_triggers)], axis=0)
 
-    for detected_point in detected_trigger:
-        matches = len([true_point
-            for true_point in true_trigger
-            if abs(true_point - detected_point) <= tolerance])
-        if matches == 0: fp += 1
+def _nearest_distances(points, sorted_points):
+    """Distance of each point to the nearest of the sorted points (infinite
+    if there are none).
+    """
+    if len(sorted_points) == 0:
+        return np.full(len(points), np.inf)
+    idxs = np.searchsorted(sorted_points, points)
+    left = sorted_points[np.maximum(idxs - 1, 0)]
+    right = sorted_points[np.minimum(idxs, len(sorted_points) - 1)]
+    return np.minimum(np.abs(points - left), np.abs(right - points))
 
-    return (tp, tn, fp, fn)
+def tolerance_metrics(true_trigger, detected_trigger, tolerances):
+    """Trigger metrics of a single record for several tolerances.
 
-def triggers_metrics(true_triggers, detected_triggers, tolerance):
-    result = (0, 0, 0, 0)
-    for true_trigger, detected_trigger in zip(true_triggers, detected_triggers):
-        metrics = trigger_metrics(true_trigger, detected_trigger, tolerance)
-        result = tuple(np.add(result, metrics))
-    return result
+    Nearest neighbour distances are computed once, the metrics for all
+    tolerances are derived from them.
+
+    Args:
+        true_trigger: List of true trigger points.
+        detected_trigger: List of detected trigger points.
+        tolerances: List of tolerances.
+    Returns:
+        Integer array of shape (len(tolerances), 4) with (TP, TN, FP, FN)
+        rows equal to trigger_metrics for the respective tolerance.
+    """
+    true_points = np.sort(np.asarray(true_trigger).reshape(-1))
+    detected_points = np.sort(np.asarray(detected_trigger).reshape(-1))
+    tolerances = np.asarray(tolerances).reshape(-1)
+
+    # true points with a detected point within tolerance
+    tp = np.searchsorted(
+        np.sort(_nearest_distances(true_points, detected_points)),
+        tolerances, side='right')
+    # detected points without a true point within tolerance
+    unmatched = len(detected_points) - np.searchsorted(
+        np.sort(_nearest_distances(detected_points, true_points)),
+        tolerances, side='right')
+    # pairs of true and detected points within tolerance, the ones besides
+    # the first match of every true point are false positives
+    pairs = (
+        np.searchsorted(
+            detected_points, true_points[:, np.newaxis] + tolerances,
+            side='right')
+        - np.searchsorted(
+            detected_points, true_points[:, np.newaxis] - tolerances,
+            side='left')).sum(axis=0)
+
+    return np.stack([
+        tp, np.zeros_like(tp), pairs - tp + unmatched,
+        len(true_points) - tp], axis=1)
+
+def metrics_table(true_triggers, detected_triggers, tolerances):
+    """Trigger metrics of several records for several tolerances.
+
+    Returns:
+        Integer array of shape (records, tolerances, 4) with (TP, TN, FP, FN)
+        for every record and tolerance.
+    """
+    metrics = [
+        tolerance_metrics(true_trigger, detected_trigger, tolerances)
+        for true_trigger, detected_trigger
+        in zip(true_triggers, detected_triggers)]
+    return np.array(metrics, dtype=int).reshape(
+        len(metrics), len(tolerances), 4)
+
+def beat_type_counts(
+        true_trigger, labels, detected_trigger, tolerance, classes):
+    """Number of true beats and of detected true beats per beat class.
+
+    Args:
+        true_trigger: List of true trigger points.
+        labels: Beat class label of each true trigger point.
+        detected_trigger: List of detected trigger points.
+        tolerance: Maximum distance of matching trigger points.
+        classes: List of beat class labels, must contain all labels.
+    Returns:
+        Integer arrays of beats and detected beats (TP), one count per class.
+    """
+    detected = _match_counts(true_trigger, detected_trigger, tolerance) > 0
+    # integer codes of labels as their index in classes
+    uniques, inverse = np.unique(
+        np.asarray(labels, dtype=str), return_inverse=True)
+    codes = np.array(
+        [classes.index(label) for label in uniques], dtype=int)[inverse]
+    beats = np.bincount(codes.reshape(-1), minlength=len(classes))
+    tp = np.bincount(
+        codes.reshape(-1), weights=detected, minlength=len(classes))
+    return beats, tp.astype(int)
 
 def sensitivity(tp, fn):
     try:
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from os import makedirs, remove
+from os.path import exists, join
+
+import numpy as np
+
+from .cacheutils import array_digest, cache_key
+from .signalutils import window_averages
+
+# transforms a feature is computed with, applied to the first channel in order
+TRANSFORMS = {
+    'ediff1d': np.ediff1d,
+    'window_average': lambda signal, size: window_averages(signal, [size])[0],
+}
+
+# version of the TRANSFORMS results, to be increased whenever a transform
+# computes different values, e.g. window averages in single precision (2)
+FEATURE_VERSION = 2
+
+# default memory budget of the feature store in bytes
+DEFAULT_BUDGET = 2**30
+
+
+def record_fingerprint(record):
+    """Identity of a record: its name and the digest of its first channel,
+    so that features are never shared by records with different samples.
+    """
+    return (record.record_name, array_digest(record.p_signal.T[0]))
+
+
+def apply_chain(signal, chain):
+    """Apply a transform chain like (('window_average', 5), ('ediff1d',)) to
+    signal.
+    """
+    for name, *args in chain:
+        signal = TRANSFORMS[name](signal, *args)
+    return signal
+
+
+class FeatureStore:
+    """Cache of features computed from the first channel of records.
+
+    Features are keyed by record fingerprint and transform chain, so that
+    all detectors using the same transforms share them. Least recently used
+    features are dropped when the memory budget is exceeded, or written to
+    memory-mapped files in spill_dir if given. Features are read-only.
+
+    Args:
+        budget (int, optional): Maximum number of bytes held in memory.
+        spill_dir (str, optional): Directory for features dropped from
+            memory. Dropped features are computed again if unspecified.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, spill_dir=None):
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._features = OrderedDict()
+        self._spilled = {}
+
+    def __len__(self):
+        return len(self._features) + len(self._spilled)
+
+    def get(self, record, chain):
+        """Feature of record computed with the transform chain."""
+        return self.get_many(record, [chain])[0]
+
+    def get_many(self, record, chains):
+        """Features of record computed with each of the transform chains.
+        Window averages at the start of missing chains are computed together
+        in one pass over the signal. The empty chain () returns a read-only
+        view of the first channel, which is not stored, so that only derived
+        features count against the budget.
+        """
+        chains = [
+            tuple(tuple(transform) for transform in chain) for chain in chains]
+        signal = record.p_signal.T[0]
+        if not all(chains):
+            raw = signal.view()
+            raw.flags.writeable = False
+        derived = [chain for chain in chains if chain]
+        fingerprint = record_fingerprint(record) if derived else None
+        features = [
+            self._lookup((fingerprint, chain)) if chain else raw
+            for chain in chains]
+
+        missing = [
+            chain for chain, feature in zip(chains, features)
+            if feature is None]
+        self.hits += len(derived) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return features
+
+        sizes = sorted(set(
+            chain[0][1] for chain in missing
+            if chain[0][0] == 'window_average'))
+        averages = dict(zip(sizes, window_averages(signal, sizes)))
+        for idx, (chain, feature) in enumerate(zip(chains, features)):
+            if feature is not None:
+                continue
+            if chain[0][0] == 'window_average':
+                feature = apply_chain(averages[chain[0][1]], chain[1:])
+            else:
+                feature = apply_chain(signal, chain)
+            feature = np.asarray(feature)
+            feature.flags.writeable = False
+            self._store((fingerprint, chain), feature)
+            features[idx] = feature
+        return features
+
+    def _lookup(self, key):
+        if key in self._features:
+            self._features.move_to_end(key)
+            return self._features[key]
+        if key in self._spilled:
+            return np.load(self._spilled[key], mmap_mode='r')
+        return None
+
+    def _store(self, key, feature):
+        if key in self._features:
+            self.size -= self._features[key].nbytes
+        self._features[key] = feature
+        self.size += feature.nbytes
+        while self.size > self.budget and self._features:
+            old_key, old_feature = self._features.popitem(last=False)
+            self.size -= old_feature.nbytes
+            if self.spill_dir is not None:
+                self._spill(old_key, old_feature)
+
+    def _spill(self, key, feature):
+        makedirs(self.spill_dir, exist_ok=True)
+        path = join(self.spill_dir, cache_key(key) + '.npy')
+        np.save(path, feature)
+        self._spilled[key] = path
+
+    def clear(self):
+        """Drop all features, including spilled ones."""
+        for path in self._spilled.values():
+            if exists(path): remove(path)
+        self._features.clear()
+        self._spilled.clear()
+        self.size = 0
+
+
+# store shared by all detectors of a process
+FEATURE_STORE = FeatureStore()
+
+
+def feature(record, chain):
+    """Feature of record from the shared FEATURE_STORE."""
+    return FEATURE_STORE.get(record, chain)
+
+
+def features(record, chains):
+    """Features of record from the shared FEATURE_STORE."""
+    return FEATURE_STORE.get_many(record, chains)
@@ -1,9 +1,19 @@
+import numpy as np
+
+
 def rescale(index_pairs, old_window_size, new_window_size):
     return [
         (chunk_index, (window_index*new_window_size) // old_window_size)
         for chunk_index, window_index in index_pairs]
 
 
+def rescale_indexes(window_indexes, old_window_size, new_window_size):
+    """Vectorized rescale for an array of window indexes. Chunk indexes are
+    not affected by rescaling and can be reused as they are.
+    """
+    return (np.asarray(window_indexes)*new_window_size) // old_window_size
+
+
 def index_pair(window_index, window_size, chunk_sizes):
     if window_index < 0:
         raise IndexError("Window index negative.")
@@ -18,12 +28,48 @@ def index_pair(window_index, window_size, chunk_sizes):
     raise IndexError("Window index out of bounds.")
 
 
+def chunk_offsets(window_size, chunk_sizes):
+    """Cumulative window counts of the chunks. Element i is the global index
+    of the first window in chunk i, the last element is the total number of
+    windows.
+    """
+    usable_chunk_lengths = np.maximum(
+        np.asarray(chunk_sizes, dtype=int) - window_size + 1, 0)
+    return np.concatenate(([0], np.cumsum(usable_chunk_lengths)))
+
+
+def index_arrays(window_indexes, offsets):
+    """Vectorized index_pair using precomputed chunk offsets (see
+    chunk_offsets). Returns an array of chunk indexes and an array of window
+    indexes within these chunks.
+    """
+    window_indexes = np.asarray(window_indexes, dtype=int)
+    if window_indexes.size > 0:
+        if window_indexes.min() < 0:
+            raise IndexError("Window index negative.")
+        if window_indexes.max() >= offsets[-1]:
+            raise IndexError("Window index out of bounds.")
+    chunk_indexes = np.searchsorted(offsets, window_indexes, side='right') - 1
+    return chunk_indexes, window_indexes - offsets[chunk_indexes]
+
+
 def indexes_for_batch(batch_index, batch_size):
     start = batch_index * batch_size
     end = (batch_index+1) * batch_size
     return range(start, end)
 
 
+def index_arrays_for_batch(batch_index, batch_size, offsets, partial=False):
+    """Index arrays of all windows in a batch. If partial is True, the last
+    batch may contain less than batch_size windows.
+    """
+    start = batch_index * batch_size
+    end = start + batch_size
+    if partial and start < offsets[-1]:
+        end = min(end, offsets[-1])
+    return index_arrays(np.arange(start, end), offsets)
+
+
 def index_pairs_for_batch(batch_index, batch_size, window_size, chunk_sizes):
     return [
         index_pair(window_index, window_size, chunk_sizes)
@@ -0,0 +1,57 @@
+"""NumPy implementations of neural network layers for inference with weights
+taken from trained Keras models.
+"""
+
+from scipy.special import expit
+
+import numpy as np
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': expit
+}
+
+
+def activation_name(layer):
+    """Name of the activation function of a Keras layer."""
+    return layer.get_config()['activation']
+
+
+def dense(inputs, kernel, bias=None, activation='linear'):
+    """Fully connected layer applied to the rows of inputs."""
+    outputs = np.dot(inputs, kernel)
+    if bias is not None:
+        outputs += bias
+    return ACTIVATIONS[activation](outputs)
+
+
+def dense_weights(layers):
+    """Kernels, biases and activation names of Keras Dense layers as used by
+    dense_stack.
+    """
+    return [
+        tuple(layer.get_weights()) + (activation_name(layer),)
+        for layer in layers]
+
+
+def dense_stack(inputs, weights):
+    """Apply a stack of fully connected layers given as (kernel, bias,
+    activation) tuples to the rows of inputs.
+    """
+    for kernel, bias, activation in weights:
+        inputs = dense(inputs, kernel, bias, activation)
+    return inputs
+
+
+def dense_stack_blocked(inputs, weights, block_size):
+    """Like dense_stack, but processes at most block_size rows of inputs at a
+    time to bound memory consumption. Useful for inputs that are strided
+    views and only materialize rows when they are computed with.
+    """
+    outputs = [
+        dense_stack(inputs[start:start + block_size], weights)
+        for start in range(0, len(inputs), block_size)]
+    if not outputs:
+        return np.zeros((0, weights[-1][0].shape[1]))
+    return np.concatenate(outputs)
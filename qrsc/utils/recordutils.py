@@ -0,0 +1,244 @@
+from glob import escape, glob
+from hashlib import sha1
+from os import makedirs, rename
+from os.path import abspath, expanduser, getmtime, isdir, join
+from shutil import rmtree
+from tempfile import mkdtemp
+import json
+
+import numpy as np
+import wfdb
+
+from .annotationutils import BEAT_CLASSIFIERS, trigger_points
+
+DEFAULT_CACHE_DIR = join(expanduser('~'), '.cache', 'qrsc', 'records')
+
+
+def _cache_key(record_path, sampfrom, sampto, channels, dtype):
+    """Key of a record read, changes whenever one of the record's files
+    (header, signal, annotation) is modified.
+    """
+    record_path = abspath(record_path)
+    mtimes = [
+        (file_name, getmtime(file_name))
+        for file_name in sorted(glob(escape(record_path) + '.*'))]
+    key = repr((
+        record_path, sampfrom, sampto, list(channels), np.dtype(dtype).str,
+        mtimes))
+    return sha1(key.encode()).hexdigest()
+
+
+def _entry_dir(cache_dir, record_path, sampfrom, sampto, channels, dtype):
+    if channels is None:
+        # same entry as reading all channels explicitly
+        channels = range(wfdb.rdheader(record_path).n_sig)
+    return join(
+        cache_dir,
+        _cache_key(
+            record_path, sampfrom, sampto, channels,
+            np.float64 if dtype is None else dtype))
+
+
+def _read_signal(record_path, sampfrom, sampto, channels, dtype):
+    record = wfdb.rdrecord(
+        record_path, sampfrom=sampfrom, sampto=sampto, channels=channels)
+    if dtype is not None:
+        record.p_signal = record.p_signal.astype(dtype, copy=False)
+    return record
+
+
+def read_trigger(
+        record_path, sampfrom=0, sampto=None, channels=None, dtype=None,
+        cache_dir=None):
+    """Read the trigger points and beat labels of a record without reading
+    its signal.
+
+    If cache_dir holds an entry of the record written by read_record with the
+    same arguments, they are taken from the entry instead of the annotation
+    file. Arguments as in read_record.
+
+    Returns:
+        Trigger points relative to sampfrom and beat labels.
+    """
+    if cache_dir is not None:
+        entry_dir = _entry_dir(
+            cache_dir, record_path, sampfrom, sampto, channels, dtype)
+        if isdir(entry_dir):
+            return _read_entry_trigger(entry_dir)
+    annotation = wfdb.rdann(
+        record_path, 'atr', sampfrom=sampfrom, sampto=sampto)
+    positions, labels = trigger_points(annotation, with_labels=True)
+    trigger = [position - sampfrom for position in positions]
+    return trigger, labels
+
+
+def _read_uncached(record_path, sampfrom, sampto, channels, dtype):
+    record = _read_signal(record_path, sampfrom, sampto, channels, dtype)
+    return (record,) + tuple(read_trigger(record_path, sampfrom, sampto))
+
+
+def _write_entry(cache_dir, entry_dir, record, trigger, labels):
+    """Write a cache entry to a temporary directory first and move it to
+    entry_dir, so that concurrent readers never see partial entries.
+    """
+    makedirs(cache_dir, exist_ok=True)
+    tmp_dir = mkdtemp(dir=cache_dir)
+    np.save(join(tmp_dir, 'signal.npy'), np.ascontiguousarray(record.p_signal))
+    np.save(join(tmp_dir, 'trigger.npy'), np.array(trigger, dtype=np.int64))
+    np.save(
+        join(tmp_dir, 'labels.npy'),
+        np.array(
+            [BEAT_CLASSIFIERS.index(label) for label in labels],
+            dtype=np.int8))
+    with open(join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({
+            'record_name': record.record_name,
+            'fs': record.fs,
+            'sig_name': record.sig_name,
+            'units': record.units}, f)
+    try:
+        rename(tmp_dir, entry_dir)
+    except OSError:
+        # written by another process in the meantime
+        rmtree(tmp_dir, ignore_errors=True)
+
+
+def _read_entry_trigger(entry_dir):
+    trigger = np.load(join(entry_dir, 'trigger.npy')).tolist()
+    labels = [
+        BEAT_CLASSIFIERS[code]
+        for code in np.load(join(entry_dir, 'labels.npy')).tolist()]
+    return trigger, labels
+
+
+def _read_entry(entry_dir):
+    with open(join(entry_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    p_signal = np.load(join(entry_dir, 'signal.npy'), mmap_mode='r')
+    record = wfdb.Record(
+        p_signal=p_signal,
+        record_name=meta['record_name'],
+        n_sig=p_signal.shape[1],
+        fs=meta['fs'],
+        sig_len=len(p_signal),
+        sig_name=meta['sig_name'],
+        units=meta['units'])
+    return (record,) + _read_entry_trigger(entry_dir)
+
+
+def read_record(
+        record_path, sampfrom=0, sampto=None, channels=None, dtype=None,
+        cache_dir=None):
+    """Read a record with its trigger points and beat labels.
+
+    If cache_dir is given, the parsed record is cached there. Later reads of
+    the same record and sample range skip parsing the wfdb files and map the
+    cached signal from disk, as long as the record's files are unchanged.
+
+    Args:
+        record_path (str): Path of the record without file extension.
+        sampfrom (int, optional): First sample read.
+        sampto (int, optional): Sample to read up to. All samples are read if
+            unspecified.
+        channels (list of int, optional): Channels read. All channels are
+            read if unspecified.
+        dtype (optional): Data type of the signal, e.g. np.float32. The
+            signal is float64 if unspecified.
+        cache_dir (str, optional): Cache directory, e.g. DEFAULT_CACHE_DIR.
+            Records are not cached if unspecified.
+    Returns:
+        wfdb Record, trigger points relative to sampfrom and beat labels.
+    """
+    if cache_dir is None:
+        return _read_uncached(record_path, sampfrom, sampto, channels, dtype)
+
+    entry_dir = _entry_dir(
+        cache_dir, record_path, sampfrom, sampto, channels, dtype)
+    if not isdir(entry_dir):
+        _write_entry(
+            cache_dir, entry_dir,
+            *_read_uncached(record_path, sampfrom, sampto, channels, dtype))
+    return _read_entry(entry_dir)
+
+
+def read_records(
+        directory, record_names, sampfrom=0, sampto=None, channels=None,
+        dtype=None, cache_dir=None):
+    """Read several records of a directory with read_record.
+
+    Returns:
+        Lists of records, trigger points and beat labels.
+    """
+    records, triggers, labels = [], [], []
+    for record_name in record_names:
+        record, trigger, record_labels = read_record(
+            join(directory, record_name), sampfrom, sampto, channels, dtype,
+            cache_dir)
+        records.append(record)
+        triggers.append(trigger)
+        labels.append(record_labels)
+    return records, triggers, labels
+
+
+class LazyRecord:
+    """Record whose signal is only read when p_signal is first accessed.
+
+    The header fields used by detectors and evaluations (record_name, fs,
+    sig_name, units, n_sig, sig_len) are read on construction. After evict,
+    the signal is read again on the next access, so that handles of records
+    not currently in use hold no signal data.
+
+    Args:
+        record_path (str): Path of the record without file extension.
+        sampfrom, sampto, channels, dtype, cache_dir: See read_record.
+    """
+
+    def __init__(
+            self, record_path, sampfrom=0, sampto=None, channels=None,
+            dtype=None, cache_dir=None):
+        header = wfdb.rdheader(record_path)
+        if channels is None:
+            channels = range(header.n_sig)
+        self.record_path = record_path
+        self.sampfrom = sampfrom
+        self.sampto = sampto
+        self.channels = list(channels)
+        self.dtype = dtype
+        self.cache_dir = cache_dir
+
+        self.record_name = header.record_name
+        self.fs = header.fs
+        self.sig_name = [header.sig_name[channel] for channel in self.channels]
+        self.units = [header.units[channel] for channel in self.channels]
+        self.n_sig = len(self.channels)
+        self.sig_len = (
+            header.sig_len if sampto is None
+            else min(sampto, header.sig_len)) - sampfrom
+        self._p_signal = None
+
+    @property
+    def p_signal(self):
+        if self._p_signal is None:
+            if self.cache_dir is None:
+                record = _read_signal(
+                    self.record_path, self.sampfrom, self.sampto,
+                    self.channels, self.dtype)
+            else:
+                record, _, _ = read_record(
+                    self.record_path, self.sampfrom, self.sampto,
+                    self.channels, self.dtype, self.cache_dir)
+            self._p_signal = record.p_signal
+        return self._p_signal
+
+    @p_signal.setter
+    def p_signal(self, p_signal):
+        self._p_signal = p_signal
+
+    @property
+    def loaded(self):
+        """Whether the signal is currently held in memory."""
+        return self._p_signal is not None
+
+    def evict(self):
+        """Drop the signal, it is read again on the next access."""
+        self._p_signal = None
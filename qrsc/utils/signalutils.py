@@ -1,5 +1,8 @@
 import numpy as np
 
+# number of samples averaged per cumulative sum in window_averages
+DEFAULT_CHUNK_SIZE = 2**16
+
 def window_average(signal, window_size):
     """Cut signal in windows of size window_size and compute average (mean) for
     each window, thus generating a new signal. The resulting signal is by factor
@@ -8,3 +11,82 @@ def window_average(signal, window_size):
     cutoff = len(signal) % window_size
     size_corrected_signal = signal if cutoff == 0 else signal[:-cutoff]
     return np.mean(size_corrected_signal.reshape(-1, window_size), axis=1)
+
+
+class WindowAverager:
+    """Streaming form of window_averages for signals arriving in chunks.
+
+    The cumulative sum of the signal is continued from chunk to chunk, so
+    that the averages of all window sizes are computed from one pass over
+    every sample. Windows spanning several chunks are completed by later
+    chunks and incomplete windows at the end of the signal are never
+    returned, like window_average drops the samples of incomplete windows.
+
+    Args:
+        window_sizes (list of int): Window sizes to average over.
+    """
+
+    def __init__(self, window_sizes):
+        self.window_sizes = list(window_sizes)
+        self.position = 0
+        self._total = 0.
+        # cumulative sum at the last window boundary of every window size
+        self._boundaries = [0.] * len(self.window_sizes)
+
+    def update(self, chunk):
+        """Feed the next chunk of the signal.
+
+        Returns:
+            One float32 array per window size with the averages of the windows
+            completed by chunk.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        # cumulative[i] is the sum of all samples before position + i
+        cumulative = np.cumsum(np.append(self._total, chunk))
+        start, end = self.position, self.position + len(chunk)
+
+        averages = []
+        for idx, window_size in enumerate(self.window_sizes):
+            first = (start // window_size + 1) * window_size
+            boundaries = cumulative[first - start:end - start + 1:window_size]
+            previous = np.append(self._boundaries[idx], boundaries[:-1])
+            averages.append(
+                ((boundaries - previous) / window_size).astype(np.float32))
+            if len(boundaries) > 0:
+                self._boundaries[idx] = boundaries[-1]
+
+        self._total = cumulative[-1]
+        self.position = end
+        return averages
+
+
+def window_averages(signal, window_sizes, chunk_size=DEFAULT_CHUNK_SIZE):
+    """window_average for several window sizes at once, computed from one
+    cumulative sum pass over signal.
+
+    Samples are summed chunk by chunk, so that temporary arrays stay small
+    and memory-mapped signals are read only once. Results do not depend on
+    chunk_size or on which other window sizes are requested.
+
+    Returns:
+        One contiguous float32 array per window size.
+    """
+    averager = WindowAverager(window_sizes)
+    parts = [[np.zeros(0, dtype=np.float32)] for _ in averager.window_sizes]
+    for start in range(0, len(signal), chunk_size):
+        for part, averages in zip(
+                parts, averager.update(signal[start:start + chunk_size])):
+            part.append(averages)
+    return [np.concatenate(part) for part in parts]
+
+
+def sliding_windows(signal, window_size):
+    """Read-only view on all windows of size window_size in signal. Row i of
+    the returned array is signal[i:i+window_size]. No samples are copied.
+    """
+    signal = np.asarray(signal)
+    num_windows = max(len(signal) - window_size + 1, 0)
+    stride = signal.strides[0]
+    return np.lib.stride_tricks.as_strided(
+        signal, shape=(num_windows, window_size), strides=(stride, stride),
+        writeable=False)
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from glob import escape, glob
+from os import makedirs
+from os.path import join
+import json
+
+import numpy as np
+
+from .evaluationutils import sensitivity, ppv, f1
+from .triggerutils import sweep
+
+# trigger signals are probabilities, half precision suffices for them
+TRIGGER_SIGNAL_DTYPE = np.float16
+
+
+def save_trigger_signals(
+        directory, name, evaluation_id, detector, record_names, true_triggers,
+        trigger_signals, trigger_distance, threshold=None, tolerance=None,
+        dtype=TRIGGER_SIGNAL_DTYPE):
+    """Store the trigger signals of an evaluation for re-thresholding them
+    later on.
+
+    Every trigger signal is written to its own memory-mappable .npy file.
+    An index file name.json lists them with the reference trigger points
+    and the evaluation's parameters. Trigger signals exceeding the range of
+    dtype, e.g. unnormalized ones of detectors without neural network, are
+    stored in single precision. Records without trigger signal, e.g. of
+    detectors generating none, are skipped. Nothing is written if no record
+    has one.
+
+    Args:
+        directory (str): Directory the files are written to.
+        name (str): Name of the evaluation, prefix of all file names.
+        evaluation_id: ID of the evaluation.
+        detector: Detector that generated the trigger signals.
+        record_names (list of str): Names of the test records.
+        true_triggers: Reference trigger points of the test records.
+        trigger_signals: Trigger signals of the test records.
+        trigger_distance (int): Trigger distance used in the evaluation.
+        threshold (float, optional): Threshold the detected trigger points
+            were derived with, see signal_to_points.
+        tolerance (int, optional): Ripple tolerance the detected trigger
+            points were derived with, see signal_to_points.
+        dtype (optional): Data type the trigger signals are stored as.
+    Returns:
+        Number of stored trigger signals.
+    """
+    stored = [
+        (record_name, true_trigger,
+         np.asarray(trigger_signal, dtype=np.float64))
+        for record_name, true_trigger, trigger_signal in zip(
+            record_names, true_triggers, trigger_signals)
+        if len(trigger_signal) > 0]
+    if not stored:
+        return 0
+
+    makedirs(directory, exist_ok=True)
+    records = []
+    for record_name, true_trigger, trigger_signal in stored:
+        signal_file = "{}_{}.npy".format(name, record_name)
+        in_range = np.abs(trigger_signal).max() <= np.finfo(dtype).max
+        np.save(
+            join(directory, signal_file),
+            trigger_signal.astype(dtype if in_range else np.float32))
+        records.append(OrderedDict([
+            ('record_name', record_name),
+            ('signal_file', signal_file),
+            ('true_trigger', np.asarray(true_trigger).tolist())]))
+    index = OrderedDict([
+        ('id', evaluation_id),
+        ('detector', repr(detector)),
+        ('threshold', threshold),
+        ('tolerance', tolerance),
+        ('trigger_distance', trigger_distance),
+        ('records', records)])
+    with open(join(directory, "{}.json".format(name)), 'w') as f:
+        json.dump(index, f)
+    return len(records)
+
+
+def load_trigger_signals(directory):
+    """Load the indexes of all evaluations stored in directory. The trigger
+    signals of their records are mapped from disk.
+
+    Returns:
+        List of index dictionaries as written by save_trigger_signals, with
+        the trigger signal of every record under 'trigger_signal'.
+    """
+    indexes = []
+    for index_file in sorted(glob(join(escape(directory), '*.json'))):
+        with open(index_file) as f:
+            index = json.load(f, object_pairs_hook=OrderedDict)
+        for record in index['records']:
+            record['trigger_signal'] = np.load(
+                join(directory, record['signal_file']), mmap_mode='r')
+        indexes.append(index)
+    return indexes
+
+
+def rethreshold(
+        directory, thresholds, tolerances, trigger_distance=None,
+        by_evaluation=False):
+    """Derive trigger points and metrics from stored trigger signals for
+    every combination of thresholds and tolerances, without running the
+    detectors again.
+
+    Args:
+        directory (str): Directory of stored trigger signals.
+        thresholds (list of float): Thresholds, see signal_to_points.
+        tolerances (list of int): Ripple tolerances, see signal_to_points.
+        trigger_distance (int, optional): Maximum distance of matching
+            trigger points. The distance of each evaluation is used if
+            unspecified.
+        by_evaluation (bool, optional): If True, metrics are aggregated per
+            evaluation instead of per detector.
+    Returns:
+        List of OrderedDicts with aggregated metrics per detector (or
+        evaluation), threshold and tolerance.
+    """
+    counts = OrderedDict()
+    for index in load_trigger_signals(directory):
+        distance = (
+            index['trigger_distance'] if trigger_distance is None
+            else trigger_distance)
+        group = (
+            (index['id'], index['detector']) if by_evaluation
+            else (None, index['detector']))
+        for record in index['records']:
+            if len(record['trigger_signal']) == 0:
+                # no trigger signal to derive trigger points from
+                continue
+            results = sweep(
+                np.asarray(record['trigger_signal'], dtype=np.float64),
+                thresholds, tolerances,
+                true_trigger=record['true_trigger'],
+                trigger_distance=distance)
+            for result in results:
+                key = group + (result['threshold'], result['tolerance'])
+                tp, fp, fn, num_records = counts.get(key, (0, 0, 0, 0))
+                counts[key] = (
+                    tp + result['TP'], fp + result['FP'], fn + result['FN'],
+                    num_records + 1)
+
+    report = []
+    for (evaluation_id, detector, threshold, tolerance), (tp, fp, fn, \
+            num_records) in counts.items():
+        report.append(OrderedDict(
+            ([('ID', evaluation_id)] if by_evaluation else [])
+            + [('Detector', detector),
+               ('Records', num_records),
+               ('Threshold', threshold),
+               ('Tolerance', tolerance),
+               ('TP', tp), ('FP', fp), ('FN', fn),
+               ('Sensitivity', sensitivity(tp, fn)),
+               ('PPV', ppv(tp, fp)),
+               ('F1', f1(tp, fp, fn))]))
+    return report
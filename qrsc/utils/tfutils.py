@@ -0,0 +1,13 @@
+from keras import backend as K
+import tensorflow as tf
+
+
+def limit_threads(num_threads):
+    """Let TensorFlow run Keras models in the current process with at most
+    num_threads threads per thread pool. Must be called before any model is
+    built.
+    """
+    config = tf.ConfigProto(
+        intra_op_parallelism_threads=num_threads,
+        inter_op_parallelism_threads=num_threads)
+    K.set_session(tf.Session(config=config))
@@ -1,5 +1,11 @@
+from bisect import bisect_right
+from collections import OrderedDict
 import itertools
 
+import numpy as np
+
+from .evaluationutils import trigger_metrics
+
 # Utility
 
 def discretize(signal, threshold=.5):
@@ -43,6 +49,129 @@ def signal_to_spikes(signal):
     ends = (idx for idx, val in enumerate(ds2) if val == -1)
     return zip(begins, ends)
 
+def _has_ones(begins, ends, lows, highs):
+    """Whether there is a 1 in [low, high] of a signal with the given runs,
+    for each low and high.
+    """
+    runs = np.minimum(
+        np.searchsorted(ends, lows, side='right'), len(ends) - 1)
+    return (ends[runs] > lows) & (np.maximum(begins[runs], lows) <= highs)
+
+def _filled_gaps(begins, ends, length, tolerance):
+    """Which 0-gaps between consecutive 1-runs remove_ripple fills.
+
+    A gap of at most tolerance samples is filled if there is a 1 at distance
+    tolerance + 1 behind a sample of the (possibly already merged) spike in
+    front of the gap. Whether the run in front of the gap alone suffices is
+    decided for all gaps at once. The remaining gaps depend on whether the
+    gaps before them were filled and are decided one after another.
+    """
+    distance = tolerance + 1
+    last_index = length - 1
+    lasts = ends[:-1] - 1
+    nexts = begins[1:]
+    candidates = nexts - lasts - 1 <= tolerance
+
+    # is there a 1 in [low, high] if the spike starts at the run in front?
+    highs = np.minimum(lasts + distance, last_index)
+    lows = np.maximum(begins[:-1] + distance, nexts)
+    filled = candidates & _has_ones(begins, ends, lows, highs)
+
+    # only gaps following a gap that might be filled remain undecided
+    undecided = candidates & ~filled
+    undecided[1:] &= candidates[:-1]
+    undecided[0] = False
+    # index of the last gap up to each gap that is certainly not filled
+    breaks = np.maximum.accumulate(
+        np.where(filled | undecided, -1, np.arange(len(candidates))))
+
+    undecided = np.flatnonzero(undecided)
+    run_begins = begins.tolist()
+    run_ends = ends.tolist()
+    last_unfilled = -1
+    for gap, first_run, next_begin, high in zip(
+            undecided.tolist(), breaks[undecided - 1].tolist(),
+            nexts[undecided].tolist(), highs[undecided].tolist()):
+        if last_unfilled > first_run:
+            first_run = last_unfilled
+        low = run_begins[first_run + 1] + distance
+        if low < next_begin:
+            low = next_begin
+        # first run ending behind low
+        run = bisect_right(run_ends, low)
+        if run < len(run_ends) and low <= high and run_begins[run] <= high:
+            filled[gap] = True
+        else:
+            last_unfilled = gap
+    return filled
+
+def _runs(ones):
+    """Begin and end indexes of the runs of True in a boolean signal."""
+    edges = np.diff(np.concatenate(([0], ones.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def _add_samples(ones, begins, ends, positions):
+    """Set positions of the boolean signal ones to True and update the begin
+    and end indexes of its runs, without scanning the whole signal.
+
+    New positions form segments of consecutive samples. A segment joins the
+    run ending right in front of it and the run beginning right behind it,
+    otherwise it begins or ends a run itself.
+
+    Returns:
+        Begin and end indexes of the runs after setting the positions.
+    """
+    if len(positions) == 0:
+        return begins, ends
+    positions = np.sort(positions)
+    breaks = np.flatnonzero(np.diff(positions) > 1)
+    segment_begins = positions[np.concatenate(([0], breaks + 1))]
+    segment_ends = positions[np.concatenate((breaks, [-1]))] + 1
+
+    # samples right next to a segment were set before, if at all
+    joins_left = segment_begins > 0
+    joins_left[joins_left] = ones[segment_begins[joins_left] - 1]
+    joins_right = segment_ends < len(ones)
+    joins_right[joins_right] = ones[segment_ends[joins_right]]
+    ones[positions] = True
+
+    begins = _replaced(
+        begins, segment_ends[joins_right], segment_begins[~joins_left])
+    ends = _replaced(
+        ends, segment_begins[joins_left], segment_ends[~joins_right])
+    return begins, ends
+
+def _replaced(indexes, removed, added):
+    """Sorted indexes without the sorted removed ones, which are contained,
+    and with the sorted added ones, which are not.
+    """
+    indexes = np.delete(indexes, np.searchsorted(indexes, removed))
+    return np.insert(indexes, np.searchsorted(indexes, added), added)
+
+def _merge_runs(begins, ends, length, tolerance):
+    """Merge runs to spikes like remove_ripple does."""
+    if len(begins) < 2:
+        return begins, ends
+    filled = _filled_gaps(begins, ends, length, tolerance)
+    return (
+        begins[np.concatenate(([True], ~filled))],
+        ends[np.concatenate((~filled, [True]))])
+
+def find_spikes(signal, threshold=.5, tolerance=3):
+    """Find the 1-spikes of a trigger signal with NumPy. Equivalent to
+    signal_to_spikes(remove_ripple(discretize(signal, threshold), tolerance)).
+
+    Args:
+        signal: Trigger signal.
+        threshold: Samples greater or equal are part of a spike.
+        tolerance: Maximum length of a 0-spike to count as ripple.
+    Returns:
+        Arrays of begin and end indexes of the 1-spikes.
+    """
+    ones = np.asarray(signal) >= threshold
+    begins, ends = _runs(ones)
+    return _merge_runs(begins, ends, len(ones), tolerance)
+
 def spikes_to_points(spikes):
     """Compute trigger points as center of spikes.
 
@@ -70,29 +199,141 @@ def signal_to_points(
             might be to account for the same trigger point.
         with_certainty: Whether to return how certain a QRS complex is at the
             corresponding trigger point.
+        spike_width: Overrides spike width for certainties, see
+            spikes_to_certainties.
         min_width: Minimum width of a spike. Smaller spikes are ignored and not
             converted to trigger points.
     Returns:
         List of trigger points. Also, list of certainties if with_certainty
         is True.
     """
-    discretized_signal = discretize(signal, threshold)
-    sanitized_signal = remove_ripple(discretized_signal, tolerance)
+    begins, ends = find_spikes(signal, threshold, tolerance)
+    wide = ends - begins >= min_width
+    begins, ends = begins[wide], ends[wide]
 
-    spikes = [
-        (begin, end)
-        for begin, end
-        in signal_to_spikes(sanitized_signal)
-        if end-begin >= min_width]
-
-    points = spikes_to_points(spikes)
+    points = ((begins + ends) // 2).tolist()
     if not with_certainty: return points
-    
-    certainties = spikes_to_certainties(spikes, signal, spike_width)
+
+    certainties = spike_means(
+        begins, ends, prefix_sums(signal), spike_width).tolist()
     return points, certainties
 
+def sweep(
+        signal, thresholds, tolerances, min_widths=(0,), spike_width=None,
+        true_trigger=None, trigger_distance=5
+):
+    """Generate trigger points from a trigger signal for every combination of
+    thresholds, tolerances and minimum widths, like signal_to_points with
+    with_certainty=True does for a single combination.
+
+    Sample values are sorted once, so that lowering the threshold only adds
+    samples to the thresholded signal. The runs above a threshold are updated
+    with the added samples only, instead of scanning the whole signal again.
+    They are shared by all tolerances and certainties come from one prefix
+    sum.
+
+    Args:
+        signal: Trigger signal the trigger points are generated from.
+        thresholds: Thresholds, see signal_to_points.
+        tolerances: Ripple tolerances, see signal_to_points.
+        min_widths: Minimum spike widths, see signal_to_points.
+        spike_width: Overrides spike width for certainties, see
+            spikes_to_certainties.
+        true_trigger: If given, detected trigger points are matched against
+            these reference trigger points.
+        trigger_distance: Maximum distance of matching trigger points.
+    Returns:
+        List of OrderedDicts with threshold, tolerance, min_width, points and
+        certainties of every combination, ordered by decreasing threshold.
+        TP, FP and FN counts are included if true_trigger is given.
+    """
+    signal = np.asarray(signal)
+    prefix = prefix_sums(signal)
+    # samples above a threshold are a prefix of the samples in this order
+    order = np.argsort(-signal, kind='stable')
+    negated_values = -signal[order]
+    ones = np.zeros(len(signal), dtype=bool)
+    begins = ends = np.zeros(0, dtype=order.dtype)
+    num_ones = 0
+
+    results = []
+    for threshold in sorted(thresholds, reverse=True):
+        count = np.searchsorted(negated_values, -threshold, side='right')
+        begins, ends = _add_samples(
+            ones, begins, ends, order[num_ones:count])
+        num_ones = count
+
+        for tolerance in tolerances:
+            spike_begins, spike_ends = _merge_runs(
+                begins, ends, len(signal), tolerance)
+            widths = spike_ends - spike_begins
+            points = (spike_begins + spike_ends) // 2
+            certainties = spike_means(
+                spike_begins, spike_ends, prefix, spike_width)
+
+            for min_width in min_widths:
+                wide = widths >= min_width
+                result = OrderedDict([
+                    ('threshold', threshold),
+                    ('tolerance', tolerance),
+                    ('min_width', min_width),
+                    ('points', points[wide].tolist()),
+                    ('certainties', certainties[..., wide].tolist())])
+                if true_trigger is not None:
+                    tp, _, fp, fn = trigger_metrics(
+                        true_trigger, result['points'], trigger_distance)
+                    result.update([('TP', tp), ('FP', fp), ('FN', fn)])
+                results.append(result)
+    return results
+
 # Synthesizing a trigger signal from trigger points
 
+def points_to_spikes(points, signal_length, window_size):
+    """1-spikes of the trigger signal synthesized by points_to_signal.
+
+    Args:
+        points: List of trigger points.
+        signal_length: Length of the synthesized trigger signal.
+        window_size: Width of the 1-spikes around the trigger points.
+    Returns:
+        Arrays of begin and end indexes of the non-empty spikes, ordered by
+        begin. Spikes may overlap.
+    """
+    points = np.sort(np.asarray(points, dtype=int))
+    begins = np.maximum(points - window_size // 2, 0)
+    ends = np.minimum(begins + window_size, signal_length)
+    non_empty = begins < ends
+    return begins[non_empty], ends[non_empty]
+
+def spike_values(begins, ends, positions):
+    """Values of a synthesized trigger signal at the given positions without
+    building the signal.
+
+    Args:
+        begins: Spike begin indexes as returned by points_to_spikes.
+        ends: Spike end indexes as returned by points_to_spikes.
+        positions: Array of positions in the trigger signal.
+    Returns:
+        Boolean array, True where a position is part of a spike.
+    """
+    positions = np.asarray(positions)
+    if len(begins) == 0:
+        return np.zeros(positions.shape, dtype=bool)
+    # ends grow with begins, so the last spike beginning at or before a
+    # position reaches furthest
+    spike_indexes = np.searchsorted(begins, positions, side='right') - 1
+    return (spike_indexes >= 0) & (
+        ends[np.maximum(spike_indexes, 0)] > positions)
+
+def points_to_signal_array(points, signal_length, window_size, dtype=float):
+    """NumPy version of points_to_signal returning an array of dtype."""
+    begins, ends = points_to_spikes(points, signal_length, window_size)
+    # number of spikes covering a sample as cumulative sum of spike edges
+    edges = (
+        np.bincount(begins, minlength=signal_length + 1)
+        - np.bincount(ends, minlength=signal_length + 1))
+    return (np.cumsum(edges[:signal_length]) > 0).astype(dtype)
+
 def points_to_signal(points, signal_length, window_size):
     """Synthesize a trigger signal from trigger points.
     
@@ -105,15 +346,40 @@ def points_to_signal(points, signal_length, window_size):
         trigger points. All signal samples are either 0 or 1 and there is no
         ripple.
     """
-    signal = [0.]*signal_length
-    for point in points:
-        start = max(point - window_size // 2, 0)
-        end = min(start + window_size, signal_length)
-        signal[start:end] = [1.]*(end-start)
-    return signal
+    return points_to_signal_array(points, signal_length, window_size).tolist()
 
 # Certainty assessment
 
+def prefix_sums(signal):
+    """Cumulative sums of a trigger signal with a leading 0, so that the sum
+    of signal[begin:end] is prefix[end] - prefix[begin]. Sums are accumulated
+    in extended precision to keep differences of large sums accurate.
+    """
+    return np.concatenate((
+        [0], np.cumsum(np.asarray(signal, dtype=np.longdouble))))
+
+def spike_means(begins, ends, prefix, spike_widths=None):
+    """Certainties of 1-spikes from prefix sums of a trigger signal.
+
+    Args:
+        begins: Array of spike begin indexes.
+        ends: Array of spike end indexes.
+        prefix: Prefix sums of the trigger signal (see prefix_sums).
+        spike_widths: Overrides spike widths with a custom value or an array
+            of custom values.
+    Returns:
+        Array of certainties. One row per spike width if spike_widths is an
+        array.
+    """
+    sums = prefix[ends] - prefix[begins]
+    if spike_widths is None:
+        widths = ends - begins
+    elif np.ndim(spike_widths) > 0:
+        widths = np.asarray(spike_widths)[:, np.newaxis]
+    else:
+        widths = spike_widths
+    return (sums / widths).astype(np.float64)
+
 def spikes_to_certainties(spikes, signal, spike_width=None):
     """Assess certainty of 1-spikes in a trigger signal.
 
@@ -121,11 +387,16 @@ def spikes_to_certainties(spikes, signal, spike_width=None):
         spikes: List of 1-spikes in a trigger signal denoted as (begin, end).
         signal: Trigger signal.
         spike_width: Overrides spike width with custom value. For example for
-            taking the width a spike should have into account.
+            taking the width a spike should have into account. If a list of
+            values is given, certainties are assessed for each of them.
     Returns:
-        List of certainties.
+        List of certainties. List of such lists if spike_width is a list.
     """
-    return [spike_certainty(spike, signal, spike_width) for spike in spikes]
+    begins, ends = (
+        np.array(indexes, dtype=int)
+        for indexes in (zip(*spikes) if spikes else ([], [])))
+    return spike_means(
+        begins, ends, prefix_sums(signal), spike_width).tolist()
 
 def spike_certainty(spike, signal, spike_width=None):
     """Assess certainty of a single 1-spike in a trigger signal.
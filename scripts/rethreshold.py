@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser
+
+import csv
+import sys
+
+from tabulate import tabulate
+
+sys.path.append("../qrsc")
+from qrsc.utils.storeutils import rethreshold
+
+parser = ArgumentParser(
+    description="A tool for re-thresholding stored trigger signals.")
+parser.add_argument(
+    'directory', type=str,
+    help="Directory of the stored trigger signals "
+    "(<output_dir>/trigger_signals of an evaluation)."
+)
+parser.add_argument(
+    '-t', '--thresholds', type=float, nargs='+', required=True,
+    help="Thresholds to derive trigger points with."
+)
+parser.add_argument(
+    '-r', '--tolerances', type=int, nargs='+', required=True,
+    help="Ripple tolerances to derive trigger points with."
+)
+parser.add_argument(
+    '-d', '--trigger-distance', type=int, required=False,
+    help="Maximum distance of matching trigger points. "
+    "Defaults to the distance of each evaluation."
+)
+parser.add_argument(
+    '-e', '--by-evaluation', action='store_true',
+    help="Report metrics per evaluation instead of per detector."
+)
+parser.add_argument(
+    '-o', '--output', type=str, required=False,
+    help="CSV file to write the report to."
+)
+
+args = parser.parse_args()
+
+report = rethreshold(
+    args.directory, args.thresholds, args.tolerances,
+    trigger_distance=args.trigger_distance, by_evaluation=args.by_evaluation)
+if not report:
+    sys.exit("No trigger signals found in {}.".format(args.directory))
+
+keys = report[0].keys()
+if args.output is not None:
+    with open(args.output, 'w+') as f:
+        dw = csv.DictWriter(f, keys)
+        dw.writeheader()
+        dw.writerows(report)
+print(tabulate([[entry[key] for key in keys] for entry in report], headers=keys))